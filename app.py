@@ -1,18 +1,26 @@
 import time
+import html
+import logging
 import asyncio
 import threading
-import schedule
+import numpy as np
+import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 
 from bot.core import TradingBot
+from bot._perf import pl_pct
+from database.db_handler import POSITION_COLUMNS, HISTORY_COLUMNS
 
 # ====================================
 # Setup
 # ====================================
 load_dotenv()
+logging.basicConfig(level=logging.INFO)
 st.set_page_config(page_title="TradingBot Web", layout="wide")
 
+MODE_MAP = {"Crypto": "crypto", "Forex": "forex", "Saham Indonesia": "saham_id"}
+
 
 @st.cache_resource
 def init_bot():
@@ -20,19 +28,415 @@ def init_bot():
     return TradingBot()
 
 
-def run_scheduler(bot):
-    """Jalankan auto scan tiap 30 detik."""
-    def scan_job():
-        if bot.mode:
-            results = bot.scan_potential_assets(10)
-            if results:
-                st.session_state['latest_results'] = results[:5]
+@st.cache_resource
+def _event_loop():
+    """Event loop bersama (thread daemon) untuk coroutine bot, dipakai ulang antar klik."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_positions(mode):
+    """Posisi aktif per market; clear() setelah setiap penulisan posisi."""
+    return init_bot().get_active_positions()
+
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _cached_history(mode, limit):
+    """History trading per market; clear() setelah posisi ditutup."""
+    return init_bot().get_trade_history(limit)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _periodic_scan(mode):
+    """Scan untuk Auto Rescan; paling banyak sekali per 30 detik per market."""
+    return [_precompute_display(r) for r in init_bot().scan_potential_assets(10)]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_analyze(mode, symbol):
+    """Analisis aset, dipakai ulang selama 60 detik."""
+    return init_bot().analyze_asset(symbol)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_custom(mode, symbol, entry_price):
+    """TP/SL custom entry; entry_price dibulatkan pemanggil agar key stabil."""
+    return init_bot().calculate_custom_entry(symbol, entry_price)
+
+
+@st.cache_data(ttl=25, show_spinner=False)
+def _cached_tickers(mode, symbols):
+    """Batch ticker untuk Live Scanner (symbols: tuple terurut)."""
+    return init_bot().data_provider.get_tickers(list(symbols))
+
+
+def _precompute_deltas(a):
+    """Simpan jarak TP1-3/SL dari ideal_entry sebagai satu array di a["_deltas"]."""
+    if a.get("ideal_entry") is not None:
+        a["_deltas"] = np.array([
+            a["tp1"] - a["ideal_entry"],
+            a["tp2"] - a["ideal_entry"],
+            a["tp3"] - a["ideal_entry"],
+            a["ideal_entry"] - a["sl"],
+        ], dtype=np.float64)
+    return a
+
+
+def _precompute_display(a):
+    """Format string tampilan hasil scan sekali saat scan, bukan di setiap rerun."""
+    a["_disp"] = {
+        "title": f"**{a['symbol']}** - {a['action']} (Score: {a['score']})",
+        "pat": ", ".join(a.get("detected_patterns", [])),
+    }
+    return a
+
+
+def _metric_grid(items, columns=2):
+    """Metric read-only (label, value) dalam satu blok HTML; satu delta, bukan satu per st.metric."""
+    rows = -(-len(items) // columns)
+    cells = "".join(
+        "<div style='padding:0.25rem 0'>"
+        f"<div style='font-size:0.875rem;opacity:0.7'>{html.escape(label)}</div>"
+        f"<div style='font-size:1.75rem'>{html.escape(str(value))}</div></div>"
+        for label, value in items
+    )
+    return (
+        "<div style='display:grid;grid-auto-flow:column;"
+        f"grid-template-columns:repeat({columns},1fr);grid-template-rows:repeat({rows},auto)'>"
+        f"{cells}</div>"
+    )
+
+
+SCAN_COLUMNS = [
+    "select", "symbol", "action", "score", "pattern_score", "entry_price",
+    "entry_low", "entry_high", "sl", "tp1", "tp2", "tp3", "patterns",
+]
+
+
+def _scan_frame(results):
+    """Hasil scan -> DataFrame untuk st.data_editor (kolom select + entry_price)."""
+    df = pd.DataFrame(results)
+    df["select"] = False
+    df["entry_price"] = df["ideal_entry"]
+    df["patterns"] = [r["_disp"]["pat"] for r in results]
+    return df[SCAN_COLUMNS]
+
+
+POSITION_EDITOR_COLUMNS = [
+    "symbol", "market_type", "action", "entry_price", "current_price",
+    "sl", "tp1", "tp2", "tp3", "pl_pct", "exit_price", "close",
+]
+
+
+def _positions_frame(rows):
+    """Baris posisi -> DataFrame dengan kolom bernama dan P/L (%)."""
+    df = pd.DataFrame(rows, columns=POSITION_COLUMNS)
+    df["current_price"] = df["current_price"].fillna(df["entry_price"])
+    df["pl_pct"] = pl_pct(
+        df["action"].eq("LONG").to_numpy(),
+        df["entry_price"].to_numpy(np.float64),
+        df["current_price"].to_numpy(np.float64),
+    )
+    return df
+
+
+def _history_frame(rows):
+    """Baris trade history -> DataFrame dengan kolom bernama."""
+    df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+    df.insert(0, "result", np.where(df["profit_loss"] > 0, "✅", "❌"))
+    return df
+
+
+# ====================================
+# Tab Fragments
+# ====================================
+@st.fragment
+def _tab_top_assets(bot):
+    """Tab 1: scan dan pilih aset. Interaksi di tab ini hanya menjalankan ulang fragment ini."""
+    st.subheader("Scan Top Aset")
+
+    if bot.mode == "crypto":
+        scan_option = st.radio("Pilih jenis scan:", ["Standard Crypto", "Pump Fun Solana"])
+    else:
+        scan_option = "Standard"
+        st.info("Mode Standard untuk Forex dan Saham Indonesia")
+
+    if st.button("Scan Aset", key="scan_assets"):
+        with st.spinner("Scanning..."):
+            if bot.mode == "crypto" and scan_option == "Pump Fun Solana":
+                results = asyncio.run_coroutine_threadsafe(bot.scan_pump_fun(), _event_loop()).result()
+                if results:
+                    st.subheader("Token Baru di Pump Fun:")
+                    for res in results:
+                        st.write(f"**{res['symbol']}** - Price: {res['ticker']['last']}, "
+                                 f"Volume: {res['ticker']['volume']}")
+                        if st.button(f"Pilih {res['symbol']}", key=f"select_pump_{res['symbol']}"):
+                            st.session_state.selected_for_entry[res['symbol']] = res
+                            st.success(f"Selected {res['symbol']}!")
+                            st.rerun(scope="fragment")
+                else:
+                    st.info("Tidak ada token baru di Pump Fun.")
+
+            else:
+                scan = asyncio.run_coroutine_threadsafe(
+                    bot.scan_potential_assets_async(50), _event_loop()
+                ).result()
+                st.session_state.scanned_results = [
+                    _precompute_display(_precompute_deltas(r)) for r in scan
+                ]
+
+    # Tampilkan hasil scan
+    if st.session_state.scanned_results:
+        st.subheader("Top Aset Potensial:")
+
+        by_symbol = {r["symbol"]: r for r in st.session_state.scanned_results}
+        edited = st.data_editor(
+            _scan_frame(st.session_state.scanned_results),
+            column_config={
+                "select": st.column_config.CheckboxColumn("Pilih"),
+                "entry_price": st.column_config.NumberColumn("Entry Price", step=0.001, format="%.5f"),
+                "entry_low": st.column_config.NumberColumn("Entry Low", format="%.5f"),
+                "entry_high": st.column_config.NumberColumn("Entry High", format="%.5f"),
+                "sl": st.column_config.NumberColumn("SL", format="%.5f"),
+                "tp1": st.column_config.NumberColumn("TP1", format="%.5f"),
+                "tp2": st.column_config.NumberColumn("TP2", format="%.5f"),
+                "tp3": st.column_config.NumberColumn("TP3", format="%.5f"),
+                "patterns": st.column_config.TextColumn("Pola Terdeteksi"),
+            },
+            disabled=[c for c in SCAN_COLUMNS if c not in ("select", "entry_price")],
+            hide_index=True,
+            use_container_width=True,
+            key="scan_editor",
+        )
+        selected = edited[edited["select"]]
+        # Simbol yang dicentang ikut dijaga oleh "Hapus Semua Sinyal Tidak Terpilih".
+        # Merge, bukan replace: pilihan dari tempat lain (tombol Pump Fun) tetap ada;
+        # yang dihapus hanya simbol editor yang tidak dicentang
+        chosen = st.session_state.selected_for_entry
+        for sym in edited.loc[~edited["select"], "symbol"]:
+            chosen.pop(sym, None)
+        chosen.update({sym: by_symbol[sym] for sym in selected["symbol"]})
+
+        if st.button(f"✅ Tambah Semua yang Dipilih ({len(selected)})",
+                     key="add_selected", disabled=selected.empty):
+            symbols, new_positions = [], []
+            for row in selected.itertuples(index=False):
+                analysis = by_symbol[row.symbol]
+                entry_price = float(row.entry_price)
+                tp1, tp2, tp3 = (entry_price + analysis["_deltas"][:3]).tolist()
+                sl = entry_price - float(analysis["_deltas"][3])
+                symbols.append(row.symbol)
+                new_positions.append(dict(
+                    symbol=row.symbol,
+                    market_type=bot.mode,
+                    action=analysis["action"],
+                    entry_price=entry_price,
+                    tp1=tp1,
+                    tp2=tp2,
+                    tp3=tp3,
+                    sl=sl,
+                    entry_low=entry_price * (1 - bot.strategy.entry_range_pct),
+                    entry_high=entry_price * (1 + bot.strategy.entry_range_pct),
+                ))
+            # Satu INSERT multi-row untuk semua pilihan: berhasil/gagal bersama
+            if bot.db.save_positions(new_positions):
+                added, failed = symbols, []
+            else:
+                added, failed = [], symbols
+
+            if added:
+                st.success(f"Posisi {', '.join(added)} ditambahkan!")
+                _cached_positions.clear()
+                st.session_state.positions_data = _cached_positions(bot.mode)
+                st.session_state.selected_positions.update(added)
+                # Hapus dari selected_for_entry setelah berhasil ditambahkan
+                for symbol in added:
+                    st.session_state.selected_for_entry.pop(symbol, None)
+            if failed:
+                st.error(f"Gagal tambah posisi: {', '.join(failed)}")
+            else:
+                # Reset centang di tabel agar posisi tidak tertambah dua kali
+                del st.session_state["scan_editor"]
+                # Rerun penuh: posisi baru juga tampil di tab Posisi Aktif dan Live Scanner
+                st.rerun()
+
+        # --- Kelola sinyal
+        st.markdown("---")
+        st.subheader("⚙️ Kelola Sinyal")
+        if st.button("🧹 Hapus Semua Sinyal Tidak Terpilih", key="confirm_delete"):
+            selected_syms = (
+                st.session_state.selected_positions
+                | st.session_state.selected_for_entry.keys()
+            )
+            non_selected = [
+                r["symbol"] for r in st.session_state.scanned_results
+                if r["symbol"] not in selected_syms
+            ]
+            bot.db.delete_signals_by_symbols(non_selected, bot.mode)
+
+            st.success("Sinyal tidak terpilih dihapus!")
+            st.session_state.scanned_results = [
+                r for r in st.session_state.scanned_results
+                if r["symbol"] in selected_syms
+            ]
+            st.rerun(scope="fragment")
+
+
+@st.fragment(run_every=30)
+def _auto_rescan(bot):
+    """Auto Rescan: dijalankan ulang tiap 30 detik selama checkbox aktif."""
+    results = _periodic_scan(bot.mode)
+    if results:
+        st.session_state['latest_results'] = results[:5]
+
+    if st.session_state["latest_results"]:
+        st.subheader("📡 Latest Scan Results:")
+        for res in st.session_state["latest_results"]:
+            st.write(res["_disp"]["title"])
+            if res["_disp"]["pat"]:
+                st.write(f"📊 Pola: {res['_disp']['pat']}")
+
+
+@st.fragment
+def _tab_positions(bot):
+    """Tab 4: posisi aktif. Perubahan posisi tetap memakai rerun penuh (dipakai Tab 6)."""
+    st.subheader("📊 Posisi Aktif")
+    
+    # Refresh positions data
+    if st.button("🔄 Refresh Posisi", key="refresh_positions"):
+        st.session_state.positions_data = _cached_positions(bot.mode)
+        st.success("Posisi diperbarui!")
+    
+    if not st.session_state.positions_data:
+        st.info("📭 Tidak ada posisi aktif.")
+    else:
+        df = _positions_frame(st.session_state.positions_data)
+        st.write(f"**📈 Total Posisi Aktif:** {len(df)}")
+
+        # Satu tabel: exit_price dan close bisa diedit, kolom lain read-only
+        df["exit_price"] = df["current_price"]
+        df["close"] = False
+        edited = st.data_editor(
+            df.set_index("id")[POSITION_EDITOR_COLUMNS],
+            column_config={
+                "entry_price": st.column_config.NumberColumn("Entry", format="%.5f"),
+                "current_price": st.column_config.NumberColumn("Current", format="%.5f"),
+                "sl": st.column_config.NumberColumn("SL", format="%.5f"),
+                "tp1": st.column_config.NumberColumn("TP1", format="%.5f"),
+                "tp2": st.column_config.NumberColumn("TP2", format="%.5f"),
+                "tp3": st.column_config.NumberColumn("TP3", format="%.5f"),
+                "pl_pct": st.column_config.NumberColumn("P/L %", format="%.2f%%"),
+                "exit_price": st.column_config.NumberColumn("Exit Price", step=0.0001, format="%.5f"),
+                "close": st.column_config.CheckboxColumn("Tutup"),
+            },
+            disabled=[c for c in POSITION_EDITOR_COLUMNS if c not in ("exit_price", "close")],
+            hide_index=True,
+            use_container_width=True,
+            key="positions_editor",
+        )
+        to_close = edited[edited["close"]]
+
+        col1, col2 = st.columns(2)
+        with col1:
+            # Update current price semua posisi dengan satu batch ticker
+            if st.button("🔄 Update Harga", key="update_position_price"):
+                tickers = bot.data_provider.get_tickers(df["symbol"].unique().tolist())
+                bot.db.update_position_prices({
+                    symbol: ticker['last']
+                    for symbol, ticker in tickers.items()
+                    if ticker and ticker.get('last') is not None
+                })
+                _cached_positions.clear()
+                st.success("Harga posisi diperbarui!")
+                st.session_state.positions_data = _cached_positions(bot.mode)
                 st.rerun()
 
-    schedule.every(30).seconds.do(scan_job)
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+        with col2:
+            # Close positions yang dicentang
+            if st.button(f"🔒 Tutup yang Dipilih ({len(to_close)})",
+                         key="close_positions", disabled=to_close.empty):
+                failed = []
+                for row in to_close.itertuples():
+                    if not bot.close_position(int(row.Index), float(row.exit_price)):
+                        failed.append(row.symbol)
+                _cached_positions.clear()
+                _cached_history.clear()
+                st.session_state.positions_data = _cached_positions(bot.mode)
+                if failed:
+                    st.error(f"Gagal menutup posisi: {', '.join(failed)}")
+                else:
+                    st.success("Posisi ditutup!")
+                    del st.session_state["positions_editor"]
+                    st.rerun()
+
+
+@st.fragment
+def _tab_history(bot):
+    """Tab 5: history trading."""
+    st.subheader("📋 History Trading")
+    
+    # Refresh history data (LIMIT dijalankan di query, bukan di Python)
+    st.slider("Jumlah trade terakhir:", 10, 200, step=10, key="history_limit")
+    if st.button("🔄 Refresh History", key="refresh_history"):
+        st.session_state.history_data = _cached_history(bot.mode, st.session_state.history_limit)
+        st.success("History diperbarui!")
+    
+    if not st.session_state.history_data:
+        st.info("📭 Tidak ada history trading.")
+    else:
+        df = _history_frame(st.session_state.history_data)
+        st.write(f"**📊 Total Trade:** {len(df)}")
+        st.dataframe(
+            df[["result", "symbol", "market_type", "action", "type",
+                "entry_price", "exit_price", "profit_loss", "timestamp"]],
+            column_config={
+                "result": st.column_config.TextColumn(""),
+                "type": st.column_config.TextColumn("Exit Type"),
+                "entry_price": st.column_config.NumberColumn("Entry", format="%.5f"),
+                "exit_price": st.column_config.NumberColumn("Exit", format="%.5f"),
+                "profit_loss": st.column_config.NumberColumn("P/L", format="%.5f"),
+                "timestamp": st.column_config.DatetimeColumn("Waktu"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def _live_prices(bot):
+    """Tab 6: harga live untuk posisi aktif."""
+    # Display current positions with live prices
+    if st.session_state.positions_data:
+        st.subheader("📊 Posisi Aktif - Live")
+        symbols = tuple(sorted({pos.symbol for pos in st.session_state.positions_data}))
+        tickers = _cached_tickers(bot.mode, symbols)
+        for pos in st.session_state.positions_data:
+            symbol = pos.symbol
+            entry_price = pos.entry_price
+            current_price = pos.current_price
+
+            # Get latest price
+            ticker = tickers.get(symbol)
+            if ticker and ticker.get('last') is not None:
+                latest_price = ticker['last']
+                price_change = ((latest_price - current_price) / current_price) * 100
+                total_change = ((latest_price - entry_price) / entry_price) * 100
+
+                color = "green" if price_change >= 0 else "red"
+                total_color = "green" if total_change >= 0 else "red"
+
+                st.write(f"**{symbol}**")
+                st.write(f"📊 Current: `{current_price:.5f}` → Live: `{latest_price:.5f}`")
+                st.write(f"📈 Change: <span style='color:{color}'>{price_change:+.2f}%</span>", unsafe_allow_html=True)
+                st.write(f"💰 Total P/L: <span style='color:{total_color}'>{total_change:+.2f}%</span>", unsafe_allow_html=True)
+                st.markdown("---")
+
+
+@st.fragment(run_every=30)
+def _live_prices_auto(bot):
+    """_live_prices yang dijalankan ulang tiap 30 detik tanpa rerun seluruh halaman."""
+    _live_prices(bot)
 
 
 # ====================================
@@ -49,9 +453,10 @@ def main():
         "last_refresh": {"positions": 0, "history": 0},
         "positions_data": [],
         "history_data": [],
+        "history_limit": 20,
         "scanned_results": [],
         "live_monitoring": False,
-        "selected_positions": [],
+        "selected_positions": set(),
         "selected_symbols": [],
         "selected_analysis": None,
         "latest_results": [],
@@ -67,31 +472,25 @@ def main():
     # -------------------------------
     with st.sidebar:
         st.header("Pilih Market")
-        mode_choice = st.selectbox("Market:", ["Crypto", "Forex", "Saham Indonesia"], key="mode")
+        mode_choice = st.selectbox("Market:", list(MODE_MAP), key="mode")
 
         if st.button("Set Market"):
-            if mode_choice == "Crypto":
-                bot.set_mode("crypto")
-            elif mode_choice == "Forex":
-                bot.set_mode("forex")
-            elif mode_choice == "Saham Indonesia":
-                bot.set_mode("saham_id")
-
-            st.session_state.scanned_results = []
-            st.session_state.selected_symbols = []
-            st.session_state.selected_analysis = None
-            st.session_state.selected_for_entry = {}
-            st.rerun()
+            target = MODE_MAP[mode_choice]
+            # Market yang sama dipilih ulang: tidak perlu reset state maupun rerun
+            if target != bot.mode:
+                bot.set_mode(target)
+                for key in ("scanned_results", "selected_symbols", "selected_analysis", "selected_for_entry"):
+                    st.session_state[key] = defaults[key]
+                st.rerun()
 
         if bot.mode:
             st.success(f"Mode: {bot.mode.upper()}")
 
             if st.button("🔄 Refresh Semua Data", key="refresh_all"):
-                st.session_state.positions_data = bot.get_active_positions()
-                st.session_state.history_data = bot.get_trade_history()
+                st.session_state.positions_data = _cached_positions(bot.mode)
+                st.session_state.history_data = _cached_history(bot.mode, st.session_state.history_limit)
                 st.session_state.last_refresh = {"positions": time.time(), "history": time.time()}
                 st.success("Data berhasil direfresh!")
-                st.rerun()
 
     if not bot.mode:
         st.warning("Pilih market di sidebar!")
@@ -108,156 +507,12 @@ def main():
     # Tab 1: Top Aset
     # ===============================
     with tab1:
-        st.subheader("Scan Top Aset")
-
-        if bot.mode == "crypto":
-            scan_option = st.radio("Pilih jenis scan:", ["Standard Crypto", "Pump Fun Solana"])
-        else:
-            scan_option = "Standard"
-            st.info("Mode Standard untuk Forex dan Saham Indonesia")
-
-        if st.button("Scan Aset", key="scan_assets"):
-            with st.spinner("Scanning..."):
-                if bot.mode == "crypto" and scan_option == "Pump Fun Solana":
-                    results = asyncio.run(bot.scan_pump_fun())
-                    if results:
-                        st.subheader("Token Baru di Pump Fun:")
-                        for res in results:
-                            st.write(f"**{res['symbol']}** - Price: {res['ticker']['last']}, "
-                                     f"Volume: {res['ticker']['volume']}")
-                            if st.button(f"Pilih {res['symbol']}", key=f"select_pump_{res['symbol']}"):
-                                st.session_state.selected_for_entry[res['symbol']] = res
-                                st.success(f"Selected {res['symbol']}!")
-                                st.rerun()
-                    else:
-                        st.info("Tidak ada token baru di Pump Fun.")
-
-                else:
-                    st.session_state.scanned_results = bot.scan_potential_assets(50)
-                    st.rerun()
-
-        # Tampilkan hasil scan
-        if st.session_state.scanned_results:
-            st.subheader("Top Aset Potensial:")
-
-            for i, res in enumerate(st.session_state.scanned_results, 1):
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.write(f"{i}. **{res['symbol']}** - {res['action']} (Score: {res['score']})")
-                    st.write(f"Entry Range: {res['entry_low']:.5f} - {res['entry_high']:.5f} | "
-                             f"SL: {res['sl']:.5f}")
-                    st.write(f"TP1: {res['tp1']:.5f} | TP2: {res['tp2']:.5f} | TP3: {res['tp3']:.5f}")
-                    
-                    # Tampilkan pola yang terdeteksi
-                    if 'detected_patterns' in res and res['detected_patterns']:
-                        st.write(f"📊 **Pola Terdeteksi:** {', '.join(res['detected_patterns'])}")
-                    
-                    # Tampilkan pattern score
-                    if 'pattern_score' in res:
-                        st.write(f"⭐ **Pattern Score:** {res['pattern_score']}")
-                        
-                with col2:
-                    if st.button(f"Pilih {i}", key=f"select_{res['symbol']}"):
-                        st.session_state.selected_for_entry[res['symbol']] = res
-                        st.success(f"Selected {res['symbol']}!")
-                        st.rerun()
-
-            # Tampilkan input entry untuk setiap simbol yang dipilih
-            for symbol, analysis in st.session_state.selected_for_entry.items():
-                st.markdown("---")
-                st.subheader(f"📈 Input Entry untuk {symbol}")
-                
-                col1, col2 = st.columns([2, 1])
-                with col1:
-                    entry_price = st.number_input(
-                        "Entry Price",
-                        value=analysis["ideal_entry"],
-                        step=0.001,
-                        key=f"entry_{symbol}"
-                    )
-                
-                with col2:
-                    if st.button(f"✅ Tambah Posisi {symbol}", key=f"add_{symbol}"):
-                        position_id = bot.db.save_position(
-                            symbol=symbol,
-                            market_type=bot.mode,
-                            action=analysis["action"],
-                            entry_price=entry_price,
-                            tp1=entry_price + (analysis["tp1"] - analysis["ideal_entry"]),
-                            tp2=entry_price + (analysis["tp2"] - analysis["ideal_entry"]),
-                            tp3=entry_price + (analysis["tp3"] - analysis["ideal_entry"]),
-                            sl=entry_price - (analysis["ideal_entry"] - analysis["sl"]),
-                            entry_low=entry_price * (1 - bot.strategy.entry_range_pct),
-                            entry_high=entry_price * (1 + bot.strategy.entry_range_pct),
-                        )
-                        if position_id:
-                            st.success(f"Posisi {symbol} ditambahkan!")
-                            st.session_state.positions_data = bot.get_active_positions()
-                            st.session_state.selected_positions.append(symbol)
-                            # Hapus dari selected_for_entry setelah berhasil ditambahkan
-                            if symbol in st.session_state.selected_for_entry:
-                                del st.session_state.selected_for_entry[symbol]
-                            st.rerun()
-                        else:
-                            st.error("Gagal tambah posisi.")
-                
-                # Tampilkan detail pola untuk analisis yang dipilih
-                if 'pattern_details' in analysis:
-                    with st.expander("🔍 Detail Pola Teknikal"):
-                        pattern_details = analysis['pattern_details']
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write("**✅ Pola Terdeteksi:**")
-                            for pattern, detected in pattern_details.items():
-                                if detected:
-                                    st.write(f"🎯 {pattern}")
-                        with col2:
-                            st.write("**❌ Pola Tidak Terdeteksi:**")
-                            for pattern, detected in pattern_details.items():
-                                if not detected:
-                                    st.write(f"⚪ {pattern}")
-                
-                # Tombol untuk menghapus pilihan
-                if st.button(f"🗑️ Hapus {symbol} dari pilihan", key=f"remove_{symbol}"):
-                    if symbol in st.session_state.selected_for_entry:
-                        del st.session_state.selected_for_entry[symbol]
-                    st.rerun()
-
-            # --- Kelola sinyal
-            st.markdown("---")
-            st.subheader("⚙️ Kelola Sinyal")
-            if st.button("🧹 Hapus Semua Sinyal Tidak Terpilih", key="confirm_delete"):
-                non_selected = [
-                    r["symbol"] for r in st.session_state.scanned_results
-                    if r["symbol"] not in st.session_state.selected_positions and 
-                    r["symbol"] not in st.session_state.selected_for_entry
-                ]
-                for sym in non_selected:
-                    bot.db.delete_signal_by_symbol(sym, bot.mode)
-
-                st.success("Sinyal tidak terpilih dihapus!")
-                st.session_state.scanned_results = [
-                    r for r in st.session_state.scanned_results
-                    if r["symbol"] in st.session_state.selected_positions or
-                    r["symbol"] in st.session_state.selected_for_entry
-                ]
-                st.rerun()
+        _tab_top_assets(bot)
 
         # --- Auto Rescan
         st.markdown("---")
         if st.checkbox("🔄 Auto Rescan (30s)"):
-            if "scheduler_thread" not in st.session_state:
-                st.session_state["scheduler_thread"] = threading.Thread(
-                    target=run_scheduler, args=(bot,), daemon=True
-                )
-                st.session_state["scheduler_thread"].start()
-
-            if "latest_results" in st.session_state:
-                st.subheader("📡 Latest Scan Results:")
-                for res in st.session_state["latest_results"]:
-                    st.write(f"**{res['symbol']}** - {res['action']} (Score: {res['score']})")
-                    if 'detected_patterns' in res and res['detected_patterns']:
-                        st.write(f"📊 Pola: {', '.join(res['detected_patterns'])}")
+            _auto_rescan(bot)
 
     # ===============================
     # Tab 2: Analisis Aset
@@ -273,9 +528,9 @@ def main():
             if st.button("🚀 Analisis Sekarang", key="analyze_btn"):
                 if symbol_to_analyze:
                     with st.spinner("Menganalisis..."):
-                        analysis = bot.analyze_asset(symbol_to_analyze)
+                        analysis = _cached_analyze(bot.mode, symbol_to_analyze)
                         if analysis:
-                            st.session_state.selected_analysis = analysis
+                            st.session_state.selected_analysis = _precompute_deltas(analysis)
                             st.success(f"Analisis untuk {symbol_to_analyze} selesai!")
                         else:
                             st.error(f"Tidak dapat menganalisis {symbol_to_analyze} atau sinyal tidak cukup kuat.")
@@ -287,20 +542,18 @@ def main():
             analysis = st.session_state.selected_analysis
             st.subheader(f"📊 Hasil Analisis untuk {analysis['symbol']}")
             
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("🎯 Aksi", analysis['action'])
-                st.metric("⭐ Skor Total", analysis['score'])
-                st.metric("💰 Harga Saat Ini", f"{analysis['current_price']:.5f}")
-                st.metric("📈 RSI", f"{analysis['rsi']:.2f}")
-                st.metric("📊 Pattern Score", analysis.get('pattern_score', 0))
-            
-            with col2:
-                st.metric("📈 Trend", analysis['trend'])
-                st.metric("🔊 Volume Ratio", f"{analysis['volume_ratio']:.2f}")
-                st.metric("📏 ATR", f"{analysis['atr']:.5f}")
-                st.metric("📶 EMA Trend", analysis['ema_trend'])
-                st.metric("🎯 EMA Score", analysis['ema_score'])
+            st.markdown(_metric_grid([
+                ("🎯 Aksi", analysis['action']),
+                ("⭐ Skor Total", analysis['score']),
+                ("💰 Harga Saat Ini", f"{analysis['current_price']:.5f}"),
+                ("📈 RSI", f"{analysis['rsi']:.2f}"),
+                ("📊 Pattern Score", analysis.get('pattern_score', 0)),
+                ("📈 Trend", analysis['trend']),
+                ("🔊 Volume Ratio", f"{analysis['volume_ratio']:.2f}"),
+                ("📏 ATR", f"{analysis['atr']:.5f}"),
+                ("📶 EMA Trend", analysis['ema_trend']),
+                ("🎯 EMA Score", analysis['ema_score']),
+            ]), unsafe_allow_html=True)
             
             # Tampilkan pola yang terdeteksi
             if 'detected_patterns' in analysis and analysis['detected_patterns']:
@@ -335,26 +588,31 @@ def main():
             )
             
             if st.button("✅ Tambahkan ke Posisi Aktif", key=f"add_analysis_{analysis['symbol']}"):
-                # Calculate TP and SL based on the entry price and the analysis
-                position_id = bot.db.save_position(
-                    symbol=analysis['symbol'],
-                    market_type=bot.mode,
-                    action=analysis["action"],
-                    entry_price=entry_price,
-                    tp1=entry_price + (analysis["tp1"] - analysis["ideal_entry"]),
-                    tp2=entry_price + (analysis["tp2"] - analysis["ideal_entry"]),
-                    tp3=entry_price + (analysis["tp3"] - analysis["ideal_entry"]),
-                    sl=entry_price - (analysis["ideal_entry"] - analysis["sl"]),
-                    entry_low=entry_price * (1 - bot.strategy.entry_range_pct),
-                    entry_high=entry_price * (1 + bot.strategy.entry_range_pct),
-                )
-                if position_id:
-                    st.success(f"Posisi {analysis['symbol']} ditambahkan!")
-                    # Refresh positions data
-                    st.session_state.positions_data = bot.get_active_positions()
-                    st.rerun()
+                if "_deltas" not in analysis:
+                    st.error("Sinyal NEUTRAL tidak memiliki level TP/SL.")
                 else:
-                    st.error("Gagal tambah posisi.")
+                    # Calculate TP and SL based on the entry price and the analysis
+                    tp1, tp2, tp3 = (entry_price + analysis["_deltas"][:3]).tolist()
+                    sl = entry_price - float(analysis["_deltas"][3])
+                    position_id = bot.db.save_position(
+                        symbol=analysis['symbol'],
+                        market_type=bot.mode,
+                        action=analysis["action"],
+                        entry_price=entry_price,
+                        tp1=tp1,
+                        tp2=tp2,
+                        tp3=tp3,
+                        sl=sl,
+                        entry_low=entry_price * (1 - bot.strategy.entry_range_pct),
+                        entry_high=entry_price * (1 + bot.strategy.entry_range_pct),
+                    )
+                    if position_id:
+                        st.success(f"Posisi {analysis['symbol']} ditambahkan!")
+                        _cached_positions.clear()
+                        # Refresh positions data
+                        st.session_state.positions_data = _cached_positions(bot.mode)
+                    else:
+                        st.error("Gagal tambah posisi.")
 
     # ===============================
     # Tab 3: Custom Entry
@@ -368,7 +626,7 @@ def main():
         if st.button("🧮 Hitung TP/SL", key="calculate_custom"):
             if symbol_custom and entry_price_custom > 0:
                 with st.spinner("Menghitung..."):
-                    result = bot.calculate_custom_entry(symbol_custom, entry_price_custom)
+                    result = _cached_custom(bot.mode, symbol_custom, round(entry_price_custom, 5))
                     if result:
                         st.session_state.custom_result = result
                         st.success("Perhitungan selesai!")
@@ -382,16 +640,14 @@ def main():
             result = st.session_state.custom_result
             st.subheader(f"📊 Hasil untuk {result['symbol']}")
             
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("💰 Entry Price", f"{result['entry_price']:.5f}")
-                st.metric("🎯 TP1", f"{result['tp1']:.5f}")
-                st.metric("🎯 TP2", f"{result['tp2']:.5f}")
-            
-            with col2:
-                st.metric("🎯 TP3", f"{result['tp3']:.5f}")
-                st.metric("🛡️ SL", f"{result['sl']:.5f}")
-                st.metric("📊 Risk/Reward", f"{(result['tp1'] - result['entry_price']) / (result['entry_price'] - result['sl']):.2f}")
+            st.markdown(_metric_grid([
+                ("💰 Entry Price", f"{result['entry_price']:.5f}"),
+                ("🎯 TP1", f"{result['tp1']:.5f}"),
+                ("🎯 TP2", f"{result['tp2']:.5f}"),
+                ("🎯 TP3", f"{result['tp3']:.5f}"),
+                ("🛡️ SL", f"{result['sl']:.5f}"),
+                ("📊 Risk/Reward", f"{(result['tp1'] - result['entry_price']) / (result['entry_price'] - result['sl']):.2f}"),
+            ]), unsafe_allow_html=True)
             
             # Tombol untuk menambahkan ke posisi
             if st.button("✅ Tambahkan ke Posisi Aktif", key="add_custom"):
@@ -409,8 +665,8 @@ def main():
                 )
                 if position_id:
                     st.success(f"Posisi {result['symbol']} ditambahkan!")
-                    st.session_state.positions_data = bot.get_active_positions()
-                    st.rerun()
+                    _cached_positions.clear()
+                    st.session_state.positions_data = _cached_positions(bot.mode)
                 else:
                     st.error("Gagal tambah posisi.")
 
@@ -418,113 +674,13 @@ def main():
     # Tab 4: Posisi Aktif
     # ===============================
     with tab4:
-        st.subheader("📊 Posisi Aktif")
-        
-        # Refresh positions data
-        if st.button("🔄 Refresh Posisi", key="refresh_positions"):
-            st.session_state.positions_data = bot.get_active_positions()
-            st.success("Posisi diperbarui!")
-            st.rerun()
-        
-        if not st.session_state.positions_data:
-            st.info("📭 Tidak ada posisi aktif.")
-        else:
-            st.write(f"**📈 Total Posisi Aktif:** {len(st.session_state.positions_data)}")
-            
-            for pos in st.session_state.positions_data:
-                # Unpack position data
-                pos_id = pos[0]
-                symbol = pos[1]
-                market_type = pos[2]
-                action = pos[3]
-                entry_price = pos[4]
-                current_price = pos[11] if len(pos) > 11 else entry_price
-                sl = pos[9] if len(pos) > 9 else 0
-                tp1 = pos[6] if len(pos) > 6 else 0
-                tp2 = pos[7] if len(pos) > 7 else 0
-                tp3 = pos[8] if len(pos) > 8 else 0
-                
-                # Calculate P/L
-                if action == "LONG":
-                    pl_pct = ((current_price - entry_price) / entry_price) * 100
-                    pl_color = "green" if pl_pct >= 0 else "red"
-                else:  # SHORT
-                    pl_pct = ((entry_price - current_price) / entry_price) * 100
-                    pl_color = "green" if pl_pct >= 0 else "red"
-                
-                st.markdown("---")
-                col1, col2, col3 = st.columns([3, 1, 1])
-                
-                with col1:
-                    st.write(f"**{symbol}** ({market_type}) - {action}")
-                    st.write(f"📥 Entry: `{entry_price:.5f}` | 📊 Current: `{current_price:.5f}`")
-                    st.write(f"🛡️ SL: `{sl:.5f}` | 🎯 TP1: `{tp1:.5f}` | 🎯 TP2: `{tp2:.5f}` | 🎯 TP3: `{tp3:.5f}`")
-                    st.write(f"💰 P/L: <span style='color:{pl_color}'>{pl_pct:.2f}%</span>", unsafe_allow_html=True)
-                
-                with col2:
-                    # Update current price
-                    if st.button("🔄", key=f"update_{symbol}"):
-                        ticker = bot.data_provider.get_ticker(symbol)
-                        if ticker and 'last' in ticker:
-                            bot.db.update_position_current_price(symbol, ticker['last'])
-                            st.success(f"Harga {symbol} diperbarui!")
-                            st.session_state.positions_data = bot.get_active_positions()
-                            st.rerun()
-                
-                with col3:
-                    # Close position
-                    exit_price = st.number_input(
-                        "Exit Price",
-                        value=float(current_price),
-                        step=0.0001,
-                        key=f"exit_{symbol}"
-                    )
-                    if st.button("🔒 Tutup", key=f"close_{symbol}"):
-                        if bot.close_position(pos_id, exit_price):
-                            st.success(f"Posisi {symbol} ditutup!")
-                            st.session_state.positions_data = bot.get_active_positions()
-                            st.rerun()
-                        else:
-                            st.error("Gagal menutup posisi.")
+        _tab_positions(bot)
 
     # ===============================
     # Tab 5: History
     # ===============================
     with tab5:
-        st.subheader("📋 History Trading")
-        
-        # Refresh history data
-        if st.button("🔄 Refresh History", key="refresh_history"):
-            st.session_state.history_data = bot.get_trade_history(20)
-            st.success("History diperbarui!")
-            st.rerun()
-        
-        if not st.session_state.history_data:
-            st.info("📭 Tidak ada history trading.")
-        else:
-            st.write(f"**📊 Total Trade:** {len(st.session_state.history_data)}")
-            
-            for trade in st.session_state.history_data:
-                # Unpack trade data
-                trade_id = trade[0]
-                symbol = trade[1]
-                market_type = trade[2]
-                action = trade[3]
-                entry_price = trade[4]
-                exit_price = trade[5]
-                profit_loss = trade[6]
-                trade_type = trade[7]
-                timestamp = trade[8]
-                
-                # Determine color based on profit/loss
-                color = "green" if profit_loss > 0 else "red"
-                emoji = "✅" if profit_loss > 0 else "❌"
-                
-                st.markdown("---")
-                st.write(f"{emoji} **{symbol}** ({market_type}) - {action} - {trade_type}")
-                st.write(f"📥 Entry: `{entry_price:.5f}` | 📤 Exit: `{exit_price:.5f}`")
-                st.write(f"💰 P/L: <span style='color:{color}'>{profit_loss:.5f}</span>", unsafe_allow_html=True)
-                st.write(f"⏰ Waktu: {timestamp}")
+        _tab_history(bot)
 
     # ===============================
     # Tab 6: Live Scanner
@@ -535,43 +691,22 @@ def main():
         # Start/stop live monitoring
         if st.button("🚀 Mulai Live Monitoring" if not st.session_state.live_monitoring else "⏹️ Hentikan Live Monitoring"):
             st.session_state.live_monitoring = not st.session_state.live_monitoring
+            # Scanner membaca _cached_tickers (batch get_tickers), jadi cache itu yang dibuang
+            _cached_tickers.clear()
             st.rerun()
         
         if st.session_state.live_monitoring:
             st.info("📡 Live monitoring aktif. Harga akan diperbarui setiap 30 detik.")
+
+            # Auto refresh: hanya fragment harga live yang dijalankan ulang tiap 30 detik
+            if st.checkbox("🔄 Auto Refresh (30s)"):
+                _live_prices_auto(bot)
+            else:
+                _live_prices(bot)
             
-            # Display current positions with live prices
-            if st.session_state.positions_data:
-                st.subheader("📊 Posisi Aktif - Live")
-                for pos in st.session_state.positions_data:
-                    symbol = pos[1]
-                    entry_price = pos[4]
-                    current_price = pos[11] if len(pos) > 11 else entry_price
-                    
-                    # Get latest price
-                    ticker = bot.data_provider.get_ticker(symbol)
-                    if ticker and 'last' in ticker:
-                        latest_price = ticker['last']
-                        price_change = ((latest_price - current_price) / current_price) * 100
-                        total_change = ((latest_price - entry_price) / entry_price) * 100
-                        
-                        color = "green" if price_change >= 0 else "red"
-                        total_color = "green" if total_change >= 0 else "red"
-                        
-                        st.write(f"**{symbol}**")
-                        st.write(f"📊 Current: `{current_price:.5f}` → Live: `{latest_price:.5f}`")
-                        st.write(f"📈 Change: <span style='color:{color}'>{price_change:+.2f}%</span>", unsafe_allow_html=True)
-                        st.write(f"💰 Total P/L: <span style='color:{total_color}'>{total_change:+.2f}%</span>", unsafe_allow_html=True)
-                        st.markdown("---")
-            
-            # Auto refresh checkbox
-            st_auto_refresh = st.checkbox("🔄 Auto Refresh (30s)")
-            if st_auto_refresh:
-                time.sleep(30)
-                st.rerun()
-                
-            # Manual refresh button
+            # Manual refresh: tombol digambar setelah harga, jadi buang cache lalu rerun
             if st.button("🔄 Refresh Sekarang"):
+                _cached_tickers.clear()
                 st.rerun()
                 
         else:
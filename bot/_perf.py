@@ -0,0 +1,47 @@
+import os
+import numpy as np
+
+# Numba opsional: tanpa numba, kernel tetap jalan sebagai NumPy biasa
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# orjson opsional: tanpa orjson, json stdlib (output tetap bytes)
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    import json
+
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps(obj):
+        return json.dumps(obj, indent=2).encode()
+
+
+def write_atomic(path, data):
+    """Tulis bytes ke file .tmp lalu os.replace: crash di tengah tidak meninggalkan file terpotong"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@njit(cache=True)
+def pl_pct(is_long, entry, current):
+    """P/L (%) per posisi; LONG untung saat harga naik, SHORT saat turun"""
+    return np.where(is_long, current - entry, entry - current) / entry * 100.0
@@ -0,0 +1,257 @@
+import numpy as np
+
+from ._perf import njit, prange
+
+# Kernel indikator: satu pass di atas array float64 contiguous, hanya nilai terakhir
+# yang dikembalikan. Seeding mengikuti TA-Lib (SMA periode pertama, lalu rekursif/Wilder)
+# sehingga fallback tanpa TA-Lib memberi angka yang sama dengan jalur TA-Lib.
+
+FLAT_RANGE_PCT = 0.02  # batas range/mean untuk garis triangle "horizontal"
+HARMONIC_EDGES = np.array([0.05, 0.1, 0.15, 0.2])  # batas bucket |perubahan harga| harmonic
+# fastmath tanpa nnan/ninf: kernel mengembalikan NaN sentinel, data yfinance bisa berisi NaN,
+# dan pemanggil mengecek np.isnan -- dengan nnan LLVM boleh menghapus pengecekan itu
+FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def ema_last(x, span):
+    """EMA terakhir: seed SMA `span` bar pertama, lalu ema = a*x + (1-a)*ema"""
+    n = x.shape[0]
+    if n < span:
+        return np.nan
+    alpha = 2.0 / (span + 1.0)
+    ema = 0.0
+    for i in range(span):
+        ema += x[i]
+    ema /= span
+    for i in range(span, n):
+        ema = alpha * x[i] + (1.0 - alpha) * ema
+    return ema
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def rsi_state(x, period):
+    """Rata-rata gain/loss Wilder terakhir (state RSI): seed SMA `period` diff pertama"""
+    n = x.shape[0]
+    if n <= period:
+        return np.nan, np.nan
+    gain = 0.0
+    loss = 0.0
+    for i in range(1, period + 1):
+        d = x[i] - x[i - 1]
+        if d > 0:
+            gain += d
+        else:
+            loss -= d
+    gain /= period
+    loss /= period
+    for i in range(period + 1, n):
+        d = x[i] - x[i - 1]
+        up = d if d > 0 else 0.0
+        down = -d if d < 0 else 0.0
+        gain = (gain * (period - 1) + up) / period
+        loss = (loss * (period - 1) + down) / period
+    return gain, loss
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def rsi_from_avgs(gain, loss):
+    """RSI dari rata-rata gain/loss; pasar datar (tanpa gain/loss) -> 50"""
+    total = gain + loss
+    if total == 0.0:
+        return 50.0
+    return 100.0 * gain / total
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def rsi_last(x, period):
+    """RSI Wilder terakhir"""
+    gain, loss = rsi_state(x, period)
+    return rsi_from_avgs(gain, loss)
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def _true_range(h, l, prev_close):
+    return max(h - l, abs(h - prev_close), abs(l - prev_close))
+
+
+@njit(cache=True, nogil=True, fastmath=FASTMATH)
+def atr_last(high, low, close, period):
+    """ATR Wilder terakhir: seed SMA `period` true range pertama, lalu (atr*(n-1)+tr)/n"""
+    n = high.shape[0]
+    if n <= period:
+        return np.nan
+    atr = 0.0
+    for i in range(1, period + 1):
+        atr += _true_range(high[i], low[i], close[i - 1])
+    atr /= period
+    for i in range(period + 1, n):
+        atr = (atr * (period - 1) + _true_range(high[i], low[i], close[i - 1])) / period
+    return atr
+
+
+@njit(cache=True, nogil=True)
+def _slopes3(hi, lo, cl):
+    """Slope OLS high/low/close terhadap 0..n-1 dalam satu loop (closed form, tanpa polyfit).
+
+    Sumbu x yang dicentering dan sum(xc^2) = n(n^2-1)/12 dihitung sekali untuk ketiganya.
+    """
+    n = hi.shape[0]
+    xm = (n - 1) / 2.0
+    ss = n * (n * n - 1) / 12.0
+    # y - y0 tidak mengubah slope (sum(x - xm) = 0), tapi seri datar jadi tepat 0
+    h0, l0, c0 = hi[0], lo[0], cl[0]
+    nh = nl = nc = 0.0
+    for i in range(n):
+        xc = i - xm
+        nh += xc * (hi[i] - h0)
+        nl += xc * (lo[i] - l0)
+        nc += xc * (cl[i] - c0)
+    return nh / ss, nl / ss, nc / ss
+
+
+# error_model='numpy': harga 0 memberi nan/inf seperti NumPy, bukan ZeroDivisionError
+@njit(cache=True, nogil=True, error_model='numpy')
+def pattern_flags(high, low, close, period, harmonic_period):
+    """Semua flag pola (triangle 5, channel/wedge 5, harmonic 5) dalam satu pass.
+
+    Urutan mengikuti PATTERN_KEYS di strategies.py.
+    """
+    flags = np.zeros(15, dtype=np.bool_)
+    n = close.shape[0]
+
+    if n >= period * 2:
+        # Window kerja float32 (OHLCV provider memang float32); akumulasi slope tetap float64
+        hi = high[n - period:].astype(np.float32)
+        lo = low[n - period:].astype(np.float32)
+        hs, ls, cs = _slopes3(hi, lo, close[n - period:].astype(np.float32))
+
+        # Triangle
+        if hs < 0 and ls > 0 and abs(hs / ls) < 1.5:
+            flags[0] = True  # symmetrical_triangle
+        # Resistance/support dianggap datar bila range-nya < 2% dari rata-rata
+        if (hi.max() - hi.min()) / hi.mean() < FLAT_RANGE_PCT and ls > 0:
+            flags[1] = True  # ascending_triangle
+        if (lo.max() - lo.min()) / lo.mean() < FLAT_RANGE_PCT and hs < 0:
+            flags[2] = True  # descending_triangle
+        if hs > 0 and ls < 0:
+            flags[3] = True  # broadening_ascending
+        elif hs < 0 and ls > 0:
+            flags[4] = True  # broadening_descending
+
+        # Channel / wedge
+        if hs > 0 and ls > 0 and cs > 0:
+            flags[5] = True  # uptrend_channel
+        if hs < 0 and ls < 0 and cs < 0:
+            flags[6] = True  # downtrend_channel
+        if abs(hs) < 0.001 and abs(ls) < 0.001:
+            flags[7] = True  # ranging_channel
+        if hs > 0 and ls > 0 and hs > ls * 1.5:
+            flags[8] = True  # rising_wedge
+        if hs < 0 and ls < 0 and abs(ls) > abs(hs) * 1.5:
+            flags[9] = True  # falling_wedge
+
+    # Harmonic (disederhanakan): bucket perubahan harga selama harmonic_period bar
+    if n >= harmonic_period:
+        first = close[n - harmonic_period]
+        move = abs((close[n - 1] - first) / first)
+        # gartley < 5% <= bat < 10% <= butterfly < 15% <= crab < 20% <= shark
+        flags[10 + np.searchsorted(HARMONIC_EDGES, move, side='right')] = True
+    return flags
+
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def signal_scores(high, low, close, volume, rsi, weights, period, harmonic_period, volume_period):
+    """Bagian numerik scoring analyze() dalam satu panggilan kernel.
+
+    Return (hh, hl, lh, ll, volume_ratio, structure_score, pattern_score, rsi_score,
+    volume_score, flags); Python tinggal menyusun dict hasil.
+    """
+    n = close.shape[0]
+
+    # HH/HL/LH/LL dari 3 bar terakhir
+    hh = hl = lh = ll = False
+    if n >= 3:
+        hh = high[n - 1] > high[n - 2] > high[n - 3]
+        hl = low[n - 1] > low[n - 2] > low[n - 3]
+        lh = high[n - 1] < high[n - 2] < high[n - 3]
+        ll = low[n - 1] < low[n - 2] < low[n - 3]
+    structure_score = 0
+    if hh or hl:
+        structure_score += 2  # Bullish pattern
+    if lh or ll:
+        structure_score -= 2  # Bearish pattern
+
+    # Volume ratio terhadap rata-rata volume_period bar terakhir
+    vol_mean = volume[max(n - volume_period, 0):].mean()
+    volume_ratio = volume[n - 1] / vol_mean if vol_mean > 0 else 1.0
+    volume_score = 1 if volume_ratio > 1.2 else 0 if volume_ratio > 0.8 else -1
+
+    # Pola: flag . bobot
+    flags = pattern_flags(high, low, close, period, harmonic_period)
+    pattern_score = 0
+    for i in range(flags.shape[0]):
+        if flags[i]:
+            pattern_score += weights[i]
+
+    # RSI (NaN -> 0)
+    rsi_score = 0
+    if 30 < rsi < 70:
+        rsi_score = 1
+    elif rsi < 30:
+        rsi_score = 2  # Oversold - good for LONG
+    elif rsi > 70:
+        rsi_score = -2  # Overbought - good for SHORT
+
+    return (hh, hl, lh, ll, volume_ratio, structure_score, pattern_score, rsi_score,
+            volume_score, flags)
+
+
+@njit(cache=True, nogil=True, parallel=True, error_model='numpy')
+def batch_signals(high, low, close, volume, weights, rsi_period, atr_period,
+                  period, harmonic_period, volume_period):
+    """Indikator + signal_scores untuk banyak simbol; input (n_symbols, n_bars) per kolom.
+
+    Paralel (prange) di sumbu simbol. Return (rsi, atr, ema13, ema21, volume_ratio,
+    ints, flags) dengan ints per simbol = hh, hl, lh, ll, structure, pattern, rsi, volume score.
+    """
+    m = close.shape[0]
+    rsi = np.empty(m)
+    atr = np.empty(m)
+    ema13 = np.empty(m)
+    ema21 = np.empty(m)
+    volume_ratio = np.empty(m)
+    ints = np.empty((m, 8), dtype=np.int64)
+    flags = np.zeros((m, weights.shape[0]), dtype=np.bool_)
+    for i in prange(m):
+        h, l, c, v = high[i], low[i], close[i], volume[i]
+        rsi[i] = rsi_last(c, rsi_period)
+        atr[i] = atr_last(h, l, c, atr_period)
+        ema13[i] = ema_last(c, 13)
+        ema21[i] = ema_last(c, 21)
+        (hh, hl, lh, ll, vr, structure_score, pattern_score, rsi_score,
+         volume_score, f) = signal_scores(h, l, c, v, rsi[i], weights,
+                                          period, harmonic_period, volume_period)
+        volume_ratio[i] = vr
+        ints[i, 0] = hh
+        ints[i, 1] = hl
+        ints[i, 2] = lh
+        ints[i, 3] = ll
+        ints[i, 4] = structure_score
+        ints[i, 5] = pattern_score
+        ints[i, 6] = rsi_score
+        ints[i, 7] = volume_score
+        flags[i] = f
+    return rsi, atr, ema13, ema21, volume_ratio, ints, flags
+
+
+def _warmup():
+    # Compile (atau load dari cache) sekali saat import, bukan di analyze() pertama
+    x = np.linspace(1.0, 2.0, 64)
+    ema_last(x, 13)
+    rsi_last(x, 14)
+    atr_last(x, x, x, 14)
+    signal_scores(x, x, x, x, 50.0, np.zeros(15, dtype=np.int8), 20, 50, 20)
+
+
+_warmup()
@@ -1,22 +1,24 @@
 import os
 import time
-import json
-import warnings
 from datetime import datetime
 import threading
-import schedule
+import atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 
+import aiohttp
 from dotenv import load_dotenv
 from .strategies import TechnicalAnalysisStrategy
 from .data_provider import (
     CCXTDataProvider,
+    AsyncCCXTDataProvider,
     YFinanceDataProvider,
     SolanaPumpFunProvider
 )
 from .notifier import SoundNotifier
+from ._perf import json_loads, json_dumps, write_atomic
 from database.db_handler import DatabaseHandler
 
-warnings.filterwarnings("ignore")
 load_dotenv()
 
 
@@ -24,11 +26,17 @@ class TradingBot:
     def __init__(self, config_path="config/config.json"):
         # === Config & Setup ===
         self.config_path = config_path
+        self._config_mtime = None
         self.load_config()
 
         self.mode = None
         self.data_provider = None
         self.pump_provider = None
+        self._http = None  # aiohttp.ClientSession, dibuat di event loop pemanggil
+        self._http_loop = None
+        self._async_provider = None  # AsyncCCXTDataProvider, hidup di event loop yang sama dengan _http
+        self._providers = {}  # mode -> (data_provider, pump_provider), exchange dipakai ulang
+        self._popular_cache = (0.0, 0, None)  # (monotonic ts, limit, assets) untuk mode aktif
 
         # === Core Modules ===
         self.strategy = TechnicalAnalysisStrategy(
@@ -39,7 +47,6 @@ class TradingBot:
         self.db = DatabaseHandler()
 
         # === State ===
-        self.timeframe = self.config.get("timeframe", "1h")
         self.alert_active = False
         self.scanner_active = False
         self.entry_positions = {}
@@ -47,17 +54,24 @@ class TradingBot:
         
         # === Background Tasks ===
         self.scheduler_thread = None
-        self.stop_scheduler = False
+        self.stop_scheduler = threading.Event()
+
+        atexit.register(self.close)
 
     # =========================================================
     # Config Handling
     # =========================================================
     def load_config(self):
-        """Load configuration from config.json"""
+        """Load configuration from config.json (no-op while the file is unchanged)"""
         try:
+            mtime = os.stat(self.config_path).st_mtime
+            if mtime == self._config_mtime:
+                return
             os.makedirs("config", exist_ok=True)
-            with open(self.config_path, "r") as f:
-                self.config = json.load(f)
+            with open(self.config_path, "rb") as f:
+                self.config = json_loads(f.read())
+            self._config_mtime = mtime
+            self._apply_config()
         except FileNotFoundError:
             self.config = {
                 "timeframe": "1h",
@@ -69,14 +83,26 @@ class TradingBot:
                 "min_score": 3,  # Reduced from 5 to 3 to get more signals
                 "max_signals": 5,
                 "update_interval": 30,  # Add update interval for background tasks
+                "scan_workers": 8,
+                "scan_concurrency": 16,
+                "markets_cache_ttl": 300,
+                "popular_cache_ttl": 600,
             }
             self.save_config()
 
     def save_config(self):
         """Save configuration to config.json"""
         os.makedirs("config", exist_ok=True)
-        with open(self.config_path, "w") as f:
-            json.dump(self.config, f, indent=4)
+        write_atomic(self.config_path, json_dumps(self.config))
+        self._config_mtime = os.stat(self.config_path).st_mtime
+        self._apply_config()
+
+    def _apply_config(self):
+        """Hoist config values read in the scan hot path into attributes"""
+        self.timeframe = self.config.get("timeframe", "1h")
+        self.ohlcv_limit = self.config.get("ohlcv_limit", 200)
+        self.min_score = self.config.get("min_score", 3)  # Reduced from 5 to 3
+        self.max_signals = self.config.get("max_signals", 5)
 
     # =========================================================
     # Mode / Provider
@@ -84,23 +110,32 @@ class TradingBot:
     def set_mode(self, mode):
         """Set market mode (crypto, forex, saham_id)"""
         self.mode = mode.lower()
-        if self.mode == "crypto":
+        self._popular_cache = (0.0, 0, None)
+        if self.mode in self._providers:
+            self.data_provider, self.pump_provider = self._providers[self.mode]
+        elif self.mode == "crypto":
             self.data_provider = CCXTDataProvider(
-                self.config.get("exchange_crypto", "binance"), "", ""
+                self.config.get("exchange_crypto", "binance"), "", "",
+                markets_cache_ttl=self.config.get("markets_cache_ttl", 300),
             )
             self.pump_provider = SolanaPumpFunProvider(
                 os.getenv("SOLANA_RPC", "https://api.mainnet-beta.solana.com")
             )
         elif self.mode == "forex":
             self.data_provider = YFinanceDataProvider(market_type="forex")
+            self.pump_provider = None
         elif self.mode == "saham_id":
             self.data_provider = YFinanceDataProvider(market_type="saham_id")
+            self.pump_provider = None
         else:
             self.data_provider = None
             self.pump_provider = None
             print(f"Invalid mode: {mode}")
             return False
 
+        # Provider (dan exchange ccxt + rate limiter-nya) dibuat sekali per mode
+        self._providers[self.mode] = (self.data_provider, self.pump_provider)
+
         print(f"Mode set to: {self.mode.upper()} with data provider: {self.data_provider}")
         
         # Start background tasks when mode is set
@@ -116,29 +151,40 @@ class TradingBot:
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             self.stop_background_tasks()
             
-        self.stop_scheduler = False
-        self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
+        # Event baru per thread: thread lama yang masih menyelesaikan scan tetap berhenti
+        self.stop_scheduler = threading.Event()
+        self.scheduler_thread = threading.Thread(
+            target=self._run_scheduler, args=(self.stop_scheduler,), daemon=True
+        )
         self.scheduler_thread.start()
         print("Background tasks started")
 
     def stop_background_tasks(self):
         """Stop background tasks"""
-        self.stop_scheduler = True
+        self.stop_scheduler.set()  # membangunkan wait() di _run_scheduler seketika
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5)
         print("Background tasks stopped")
 
-    def _run_scheduler(self):
+    def _run_scheduler(self, stop):
         """Run scheduled tasks in background"""
-        # Update prices every 30 seconds
-        schedule.every(self.config.get("update_interval", 30)).seconds.do(self.update_all_prices)
-        
-        # Run scanner every 5 minutes
-        schedule.every(5).minutes.do(self.scan_potential_assets)
-        
-        while not self.stop_scheduler:
-            schedule.run_pending()
-            time.sleep(1)
+        price_interval = self.config.get("update_interval", 30)  # Update prices every 30 seconds
+        scan_interval = 5 * 60  # Run scanner every 5 minutes
+
+        now = time.monotonic()
+        self._next_price_update = now + price_interval
+        self._next_scan = now + scan_interval
+
+        # Tidur sampai deadline terdekat (bukan polling tiap detik)
+        while not stop.wait(max(0.0, min(self._next_price_update, self._next_scan) - now)):
+            now = time.monotonic()
+            if now >= self._next_price_update:
+                self.update_all_prices()
+                self._next_price_update = time.monotonic() + price_interval
+            if now >= self._next_scan:
+                self.scan_potential_assets()
+                self._next_scan = time.monotonic() + scan_interval
+            now = time.monotonic()
 
     def update_all_prices(self):
         """Update prices for all active positions"""
@@ -146,17 +192,20 @@ class TradingBot:
             return
             
         try:
-            active_positions = self.get_active_positions()
-            for position in active_positions:
-                symbol = position[1]  # symbol is at index 1
-                try:
-                    ticker = self.data_provider.get_ticker(symbol)
-                    if ticker and 'last' in ticker:
-                        current_price = ticker['last']
-                        self.db.update_position_current_price(symbol, current_price)
-                        print(f"Updated price for {symbol}: {current_price}")
-                except Exception as e:
-                    print(f"Error updating price for {symbol}: {e}")
+            active_positions = self.db.get_active_positions(self.mode)
+            symbols = list(dict.fromkeys(p.symbol for p in active_positions))
+            if not symbols:
+                return
+
+            # Satu request untuk semua posisi, bukan satu get_ticker per simbol
+            tickers = self.data_provider.get_tickers(symbols)
+            prices = {
+                symbol: tickers[symbol]['last']
+                for symbol in symbols
+                if tickers.get(symbol) and tickers[symbol].get('last') is not None
+            }
+            updated = self.db.update_position_prices(prices)
+            print(f"Updated prices for {updated}/{len(symbols)} symbols")
         except Exception as e:
             print(f"Error in update_all_prices: {e}")
 
@@ -170,9 +219,17 @@ class TradingBot:
             return []
 
         limit = limit or self.config.get("analysis_coins_limit", 50)
+
+        # Daftar populer jarang berubah dalam hitungan menit: slice dari cache selama TTL
+        ts, cached_limit, cached = self._popular_cache
+        if cached and cached_limit >= limit and time.monotonic() - ts < self.config.get("popular_cache_ttl", 600):
+            return cached[:limit]
+
         try:
             assets = self.data_provider.get_popular_assets(limit)
-            if not assets:
+            if assets:
+                self._popular_cache = (time.monotonic(), limit, assets)
+            else:
                 print(f"No popular assets found for {self.mode}")
                 # Return fallback assets based on mode
                 if self.mode == "crypto":
@@ -199,38 +256,97 @@ class TradingBot:
             print("No data provider for scanning.")
             return []
 
+        self.load_config()
         results = []
         popular_assets = self.get_popular_assets(limit)
         print(f"Scanning {len(popular_assets)} assets for {self.mode}")
 
-        for i, asset in enumerate(popular_assets, 1):
-            print(f"Analyzing {i}/{len(popular_assets)}: {asset}")
-            try:
-                df = self.data_provider.get_ohlcv(
-                    asset, self.timeframe, self.config.get("ohlcv_limit", 200)
-                )
-                if df is None or len(df) < 50:  # Reduced from 100 to 50 to allow more assets
-                    print(f"Insufficient data for {asset}")
+        # Fetch + analisa paralel (I/O-bound); ccxt enableRateLimit tetap menjaga kuota.
+        # Worker hanya fetch + analisa; sinyal disimpan sekali di akhir (_finish_scan)
+        # sebagai satu bulk insert, bukan satu INSERT per worker.
+        workers = self.config.get("scan_workers", 8)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._analyze_one, asset): rank for rank, asset in enumerate(popular_assets)}
+            for i, future in enumerate(as_completed(futures), 1):
+                analysis = future.result()
+                if analysis is None:
                     continue
+                print(f"Signal {i}/{len(popular_assets)}: {analysis['symbol']}")
+                results.append((futures[future], analysis))
 
-                analysis = self.strategy.analyze(df)
-                if (
-                    analysis
-                    and analysis["action"] in ["LONG", "SHORT"]
-                    and analysis["score"] >= self.config.get("min_score", 3)  # Reduced from 5 to 3
-                ):
-                    analysis["symbol"] = asset
-                    analysis["market_type"] = self.mode
-                    self.db.save_signal(analysis)
-                    results.append(analysis)
+        results.sort(key=lambda x: x[0])  # kembali ke urutan popularitas
+        return self._finish_scan([analysis for _, analysis in results])
 
-                time.sleep(0.2)  # avoid rate limits
-            except Exception as e:
-                print(f"Error analyzing {asset}: {e}")
-                continue
+    def _finish_scan(self, results):
+        """Save scan signals in one transaction and return the top ones by score"""
+        try:
+            self.db.save_signals_bulk(results)
+        except Exception as e:
+            print(f"Error saving scan signals: {e}")
 
+        # sort stabil: skor sama tetap sesuai urutan popularitas
         results.sort(key=lambda x: x.get("score", 0), reverse=True)
-        return results[: self.config.get("max_signals", 5)]
+        return results[: self.max_signals]
+
+    async def scan_potential_assets_async(self, limit=None):
+        """Async scan: fetch OHLCV for all assets concurrently on one event loop (crypto)"""
+        if self.mode != "crypto" or not self.data_provider:
+            return await asyncio.to_thread(self.scan_potential_assets, limit)
+
+        self.load_config()
+        popular_assets = await asyncio.to_thread(self.get_popular_assets, limit)
+        print(f"Scanning {len(popular_assets)} assets for {self.mode} (async)")
+
+        provider = await self._get_async_provider()
+        sem = asyncio.Semaphore(self.config.get("scan_concurrency", 16))
+        timeframe, ohlcv_limit = self.timeframe, self.ohlcv_limit
+
+        async def fetch(rank, asset):
+            async with sem:
+                return rank, asset, await provider.get_ohlcv_async(asset, timeframe, ohlcv_limit)
+
+        # Analisa tiap aset begitu OHLCV-nya tiba, sementara fetch lain masih in-flight
+        results = []
+        for coro in asyncio.as_completed([fetch(rank, a) for rank, a in enumerate(popular_assets)]):
+            rank, asset, df = await coro
+            analysis = self._analyze_df(asset, df)
+            if analysis is not None:
+                results.append((rank, analysis))
+
+        results.sort(key=lambda x: x[0])  # kembali ke urutan popularitas
+        # Simpan sekali di akhir scan: satu bulk insert lewat satu koneksi pool
+        return self._finish_scan([analysis for _, analysis in results])
+
+    def _analyze_one(self, asset):
+        """Fetch + analyze one asset for the scanner; returns a LONG/SHORT signal or None"""
+        try:
+            df = self.data_provider.get_ohlcv(
+                asset, self.timeframe, self.ohlcv_limit
+            )
+        except Exception as e:
+            print(f"Error analyzing {asset}: {e}")
+            return None
+        return self._analyze_df(asset, df)
+
+    def _analyze_df(self, asset, df):
+        """Scanner filter on fetched OHLCV: LONG/SHORT with score >= min_score, else None"""
+        try:
+            if df is None or len(df) < 50:  # Reduced from 100 to 50 to allow more assets
+                print(f"Insufficient data for {asset}")
+                return None
+
+            analysis = self.strategy.analyze(df, symbol=asset, timeframe=self.timeframe)
+            if (
+                analysis
+                and analysis["action"] in ["LONG", "SHORT"]
+                and analysis["score"] >= self.min_score
+            ):
+                analysis["symbol"] = asset
+                analysis["market_type"] = self.mode
+                return analysis
+        except Exception as e:
+            print(f"Error analyzing {asset}: {e}")
+        return None
 
     def analyze_asset(self, symbol):
         """Analyze a specific asset and return signal"""
@@ -239,10 +355,10 @@ class TradingBot:
             return None
         try:
             df = self.data_provider.get_ohlcv(
-                symbol, self.timeframe, self.config.get("ohlcv_limit", 200)
+                symbol, self.timeframe, self.ohlcv_limit
             )
             if df is not None and len(df) >= 50:  # Reduced from 100 to 50
-                analysis = self.strategy.analyze(df)
+                analysis = self.strategy.analyze(df, symbol=symbol, timeframe=self.timeframe)
                 if analysis:
                     analysis["symbol"] = symbol
                     analysis["market_type"] = self.mode
@@ -254,13 +370,62 @@ class TradingBot:
             print(f"Error analyzing {symbol}: {e}")
             return None
 
+    async def _get_http(self):
+        """Lazily create one aiohttp session, reused across Pump Fun and async scans"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300)
+            self._http = aiohttp.ClientSession(connector=connector)
+            self._http_loop = asyncio.get_running_loop()
+        return self._http
+
+    async def _get_async_provider(self):
+        """Lazily create the async ccxt exchange on the shared aiohttp session"""
+        if self._async_provider is None:
+            self._async_provider = AsyncCCXTDataProvider(
+                self.config.get("exchange_crypto", "binance"), "", "",
+                session=await self._get_http(),
+            )
+        return self._async_provider
+
+    async def _aclose(self, http):
+        if self._async_provider is not None:
+            await self._async_provider.close()
+            self._async_provider = None
+        await http.close()
+
+    def close(self):
+        """Stop background tasks and release HTTP/exchange connections"""
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.stop_background_tasks()
+
+        http, loop = self._http, self._http_loop
+        self._http = None
+        if http is not None and not http.closed:
+            try:
+                if loop is not None and loop.is_running():
+                    asyncio.run_coroutine_threadsafe(self._aclose(http), loop).result(timeout=5)
+                elif loop is not None and not loop.is_closed():
+                    loop.run_until_complete(self._aclose(http))
+            except Exception as e:
+                print(f"Error closing HTTP session: {e}")
+
+        for data_provider, _ in self._providers.values():
+            if isinstance(data_provider, CCXTDataProvider):
+                data_provider.close()
+            session = getattr(data_provider, "_session", None)
+            if session is not None:
+                session.close()
+        self._providers.clear()
+        self.db.close()
+
     async def scan_pump_fun(self):
         """Scan new tokens on Solana Pump Fun"""
         if not self.pump_provider:
             print("No Pump Fun provider available.")
             return []
         try:
-            return await self.pump_provider.monitor_new_tokens(10)
+            http = await self._get_http()
+            return await self.pump_provider.monitor_new_tokens(10, http=http)
         except Exception as e:
             print(f"Error scanning Pump Fun: {e}")
             return []
@@ -272,7 +437,7 @@ class TradingBot:
             return None
         try:
             df = self.data_provider.get_ohlcv(
-                symbol, self.timeframe, self.config.get("ohlcv_limit", 200)
+                symbol, self.timeframe, self.ohlcv_limit
             )
             if df is not None and len(df) >= 50:  # Reduced from 100 to 50
                 atr = self.strategy.calculate_atr(df)
@@ -297,13 +462,22 @@ class TradingBot:
         """Get active positions from database"""
         try:
             positions = self.db.get_active_positions(self.mode)
-            # Update prices before returning
-            for position in positions:
-                symbol = position[1]
-                ticker = self.data_provider.get_ticker(symbol)
-                if ticker and 'last' in ticker:
-                    self.db.update_position_current_price(symbol, ticker['last'])
-            return self.db.get_active_positions(self.mode)
+            if not positions or not self.data_provider:
+                return positions
+
+            # Satu batch ticker + satu transaksi, lalu patch harga di memori (tanpa query ulang)
+            tickers = self.data_provider.get_tickers({p.symbol for p in positions})
+            prices = {
+                symbol: ticker['last']
+                for symbol, ticker in tickers.items()
+                if ticker and ticker.get('last') is not None
+            }
+            self.db.update_position_prices(prices)
+
+            return [
+                p._replace(current_price=prices[p.symbol]) if p.symbol in prices else p
+                for p in positions
+            ]
         except Exception as e:
             print(f"Error fetching active positions: {e}")
             return []
@@ -319,12 +493,7 @@ class TradingBot:
     def delete_signals_not_selected(self, selected_symbols):
         """Delete non-selected signals from signals table"""
         try:
-            all_signals = self.db.get_all_signals(self.mode)
-            for signal in all_signals:
-                symbol = signal[1]  # column: symbol
-                if symbol not in selected_symbols:
-                    self.db.delete_signal_by_symbol(symbol, self.mode)
-                    print(f"Deleted non-selected signal for {symbol}")
+            self.db.delete_signals_not_in(selected_symbols, self.mode)
         except Exception as e:
             print(f"Error deleting non-selected signals: {e}")
 
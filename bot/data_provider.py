@@ -1,12 +1,179 @@
-import ccxt
+import numpy as np
 import pandas as pd
-import yfinance as yf
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+import os
+import glob
+import functools
+import importlib
+import queue
+from contextlib import contextmanager
+from collections import OrderedDict
 from abc import ABC, abstractmethod
-from solana.rpc.api import Client
-from solana.rpc.websocket_api import connect
+from cachetools import TTLCache, TLRUCache
 import json
 import asyncio
-import base58  # Untuk decode pubkey
+
+# Ticker yang diminta ulang dalam jendela ini dilayani dari cache per-instance
+TICKER_CACHE_TTL = 5
+# load_markets/fetch_tickers (multi-MB) dan daftar populer hasil sort dipakai ulang selama ini
+MARKETS_CACHE_TTL = 300
+# Base stablecoin yang tidak ikut discan
+EXCLUDED_BASES = frozenset(('BUSD', 'USDC', 'DAI', 'TUSD', 'USDP', 'UST'))
+HTTP_POOL_SIZE = 32
+# Kolom harga/volume OHLCV: float32 = separuh byte untuk pass indikator (timestamp tetap datetime64)
+OHLCV_DTYPE = np.float32
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# Root project (bukan cwd): cache parquet selalu di <project>/cache/ohlcv, dan /cache/ di-.gitignore
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OHLCV_CACHE_DIR = os.path.join(PROJECT_DIR, 'cache', 'ohlcv')
+
+
+TIMEFRAME_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+
+
+@functools.lru_cache(maxsize=None)
+def _import(name):
+    """Import berat (ccxt, yfinance, solana) ditunda sampai provider-nya benar-benar dibuat"""
+    return importlib.import_module(name)
+
+
+def _timeframe_seconds(timeframe):
+    return int(timeframe[:-1]) * TIMEFRAME_SECONDS[timeframe[-1]]
+
+
+def _ohlcv_ttu(key, value, now):
+    # OHLCV (symbol, timeframe, limit) berlaku setengah durasi timeframe-nya ('15m', '1h', '1d', ...)
+    return now + _timeframe_seconds(key[1]) // 2
+
+
+def _ohlcv_frame(ohlcv):
+    """List ccxt [[ts, o, h, l, c, v], ...] -> DataFrame, lewat satu array (harga OHLCV_DTYPE)"""
+    arr = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+    px = arr[:, 1:].astype(OHLCV_DTYPE)
+    return pd.DataFrame({
+        'timestamp': arr[:, 0].astype('datetime64[ms]'),
+        'open': px[:, 0],
+        'high': px[:, 1],
+        'low': px[:, 2],
+        'close': px[:, 3],
+        'volume': px[:, 4],
+    }, copy=False)
+
+
+def _cached_ohlcv(fetch):
+    """Memoize get_ohlcv per (symbol, timeframe, limit); refresh=True memaksa fetch ulang"""
+    @functools.wraps(fetch)
+    def wrapper(self, symbol, timeframe, limit=200, refresh=False):
+        key = (symbol, timeframe, limit)
+        if not refresh:
+            with self._ohlcv_lock:
+                df = self._ohlcv_cache.get(key)
+            if df is not None:
+                return df
+        df = fetch(self, symbol, timeframe, limit)
+        if df is not None:
+            with self._ohlcv_lock:
+                self._ohlcv_cache[key] = df
+        return df
+    return wrapper
+
+
+def _cached_ticker(fetch):
+    """Memoize get_ticker per symbol selama TICKER_CACHE_TTL; None (429 / jaringan) tidak di-cache"""
+    @functools.wraps(fetch)
+    def wrapper(self, symbol):
+        with self._ticker_lock:
+            ticker = self._ticker_cache.get(symbol)
+        if ticker is not None:
+            return ticker
+        ticker = fetch(self, symbol)
+        if ticker is not None:
+            with self._ticker_lock:
+                self._ticker_cache[symbol] = ticker
+        return ticker
+    return wrapper
+
+
+class OHLCVCache:
+    """Cache OHLCV dua level (memori LRU + parquet di disk) per (symbol, timeframe, limit, bucket).
+
+    bucket = waktu // durasi timeframe, jadi fetch dipakai ulang sampai bar berikutnya dibuka
+    (juga lintas restart lewat file parquet).
+    """
+    def __init__(self, cache_dir=None, maxsize=256):
+        # Path relatif dihitung dari root project, bukan dari cwd
+        self.cache_dir = os.path.join(PROJECT_DIR, cache_dir) if cache_dir else OHLCV_CACHE_DIR
+        self.maxsize = maxsize
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, symbol, timeframe, limit):
+        return (symbol, timeframe, limit, int(time.time() // _timeframe_seconds(timeframe)))
+
+    def _path(self, key, bucket=True):
+        symbol, timeframe, limit, b = key
+        name = f"{symbol.replace('/', '_')}_{timeframe}_{limit}_"
+        return os.path.join(self.cache_dir, name + (f"{b}.parquet" if bucket else "*.parquet"))
+
+    def get(self, symbol, timeframe, limit):
+        key = self._key(symbol, timeframe, limit)
+        with self._lock:
+            df = self._mem.get(key)
+            if df is not None:
+                self._mem.move_to_end(key)
+                return df
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception as e:
+            print(f"Error reading OHLCV cache {path}: {e}")
+            return None
+        self._remember(key, df)
+        return df
+
+    def put(self, symbol, timeframe, limit, df):
+        if df is None:
+            return
+        key = self._key(symbol, timeframe, limit)
+        self._remember(key, df)
+        path = self._path(key)
+        try:
+            # Bucket lama simbol ini sudah basi
+            for old in glob.glob(self._path(key, bucket=False)):
+                if old != path:
+                    os.remove(old)
+            df.to_parquet(path, index=False)
+        except Exception as e:
+            print(f"Error writing OHLCV cache {path}: {e}")
+
+    def put_raw(self, symbol, timeframe, limit, ohlcv):
+        """put() untuk list ccxt mentah; frame hanya dibangun untuk disimpan"""
+        if ohlcv:
+            self.put(symbol, timeframe, limit, _ohlcv_frame(ohlcv))
+
+    def _remember(self, key, df):
+        with self._lock:
+            self._mem[key] = df
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.maxsize:
+                self._mem.popitem(last=False)
+
+
+def _keepalive_session():
+    """requests.Session dengan pool koneksi cukup untuk semua worker scan"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
 
 class DataProvider(ABC):
     @abstractmethod
@@ -21,45 +188,175 @@ class DataProvider(ABC):
     def get_popular_assets(self, limit):
         pass
 
+    def _init_caches(self):
+        self._ticker_cache = TTLCache(maxsize=512, ttl=TICKER_CACHE_TTL)
+        self._ticker_lock = threading.Lock()
+        self._ohlcv_cache = TLRUCache(maxsize=512, ttu=_ohlcv_ttu, timer=time.monotonic)
+        self._ohlcv_lock = threading.Lock()
+
+    def clear_ticker_cache(self):
+        """Buang ticker yang di-cache agar request berikutnya mengambil harga baru"""
+        with self._ticker_lock:
+            self._ticker_cache.clear()
+
+    def get_tickers(self, symbols):
+        """Ticker untuk banyak simbol sekaligus: {symbol: ticker}"""
+        tickers = {}
+        for symbol in symbols:
+            ticker = self.get_ticker(symbol)
+            if ticker:
+                tickers[symbol] = ticker
+        return tickers
+
+class RateLimiter:
+    """Token bucket bersama antar thread: total QPS semua exchange per-thread tetap sesuai batas"""
+    def __init__(self, tokens_per_sec, capacity=1.0):
+        self.rate = float(tokens_per_sec)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0  # reservasi; saldo negatif = antrean
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
 class CCXTDataProvider(DataProvider):
-    def __init__(self, exchange_id='binance', api_key='', secret=''):
-        exchange_class = getattr(ccxt, exchange_id)
-        self.exchange = exchange_class({
+    def __init__(self, exchange_id='binance', api_key='', secret='', markets_cache_ttl=MARKETS_CACHE_TTL):
+        self._exchange_class = getattr(_import('ccxt'), exchange_id)
+        self._exchange_config = {
             'apiKey': api_key,
             'secret': secret,
-            'enableRateLimit': True,
-        })
+            # Throttle ccxt per-instance dimatikan; diganti RateLimiter bersama di bawah
+            'enableRateLimit': False,
+        }
+        # Pool instance ccxt: satu instance dipakai satu thread pada satu waktu
+        # (threading.local akan bocor karena Streamlit/ThreadPool membuat thread baru tiap run)
+        self._idle = queue.LifoQueue()
+        self._exchanges = []
+        self._exchanges_lock = threading.Lock()
+        self._init_caches()
+        self.markets_cache_ttl = markets_cache_ttl
+        self._markets_cache = (0.0, None)   # (monotonic ts, markets)
+        self._tickers_cache = (0.0, None)   # (monotonic ts, semua tickers)
+        self._ranked_cache = (0.0, None)    # (monotonic ts, filtered_markets terurut volume)
+        self.exchange = self._new_exchange()  # metadata (id, rateLimit); request lewat _borrow()
+        self._idle.put(self.exchange)
+        self._limiter = RateLimiter(1000.0 / self.exchange.rateLimit)
+
+    def _new_exchange(self):
+        exchange = self._exchange_class(self._exchange_config)
+        exchange.session = _keepalive_session()
+        markets = self._markets_cache[1]
+        if markets is not None:
+            exchange.set_markets(markets)  # tanpa load_markets ulang per instance
+        with self._exchanges_lock:
+            self._exchanges.append(exchange)
+        return exchange
+
+    @contextmanager
+    def _borrow(self):
+        """Pinjam instance ccxt bebas (state throttler/nonce ccxt tidak thread-safe) + 1 token rate limit"""
+        try:
+            exchange = self._idle.get_nowait()
+        except queue.Empty:
+            exchange = self._new_exchange()
+        try:
+            self._limiter.acquire()
+            yield exchange
+        finally:
+            self._idle.put(exchange)
+
+    def close(self):
+        with self._exchanges_lock:
+            for exchange in self._exchanges:
+                exchange.session.close()
+
+    def _fresh(self, cache):
+        t, data = cache
+        return data is not None and time.monotonic() - t < self.markets_cache_ttl
+
+    def _load_markets(self):
+        if not self._fresh(self._markets_cache):
+            reload = self._markets_cache[1] is not None
+            with self._borrow() as exchange:
+                self._markets_cache = (time.monotonic(), exchange.load_markets(reload=reload))
+        return self._markets_cache[1]
+
+    def preload_markets(self):
+        """Muat markets sekali di awal: pool instance berikutnya memakai ulang lewat set_markets"""
+        try:
+            self._load_markets()
+        except Exception as e:
+            print(f"Error loading markets: {e}")
+
+    def _fetch_all_tickers(self):
+        if not self._fresh(self._tickers_cache):
+            with self._borrow() as exchange:
+                self._tickers_cache = (time.monotonic(), exchange.fetch_tickers())
+        return self._tickers_cache[1]
         
+    @_cached_ohlcv
     def get_ohlcv(self, symbol, timeframe, limit=200):
         try:
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
+            with self._borrow() as exchange:
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            return _ohlcv_frame(ohlcv)
         except Exception as e:
             print(f"Error getting data for {symbol}: {e}")
             return None
-            
+
+    @_cached_ticker
     def get_ticker(self, symbol):
         try:
-            return self.exchange.fetch_ticker(symbol)
+            with self._borrow() as exchange:
+                return exchange.fetch_ticker(symbol)
         except Exception as e:
             print(f"Error getting ticker for {symbol}: {e}")
             return None
+
+    def get_tickers(self, symbols):
+        # Satu request untuk semua simbol
+        if not symbols:
+            return {}
+        try:
+            with self._borrow() as exchange:
+                return exchange.fetch_tickers(list(symbols))
+        except Exception as e:
+            print(f"Error getting tickers for {symbols}: {e}")
+            return {}
             
     def get_popular_assets(self, limit=100):
+        # Daftar lengkap yang sudah diurutkan di-cache; limit berapa pun cukup di-slice
+        if self._fresh(self._ranked_cache):
+            return self._ranked_cache[1][:limit]
         try:
-            markets = self.exchange.load_markets()
+            markets = self._load_markets()
             if self.exchange.id == 'binance':
                 usdt_markets = [symbol for symbol in markets if symbol.endswith('/USDT')]
-                excluded_coins = ['BUSD', 'USDC', 'DAI', 'TUSD', 'USDP', 'UST']
                 filtered_markets = [
-                    symbol for symbol in usdt_markets 
-                    if not any(excluded in symbol for excluded in excluded_coins)
+                    symbol for symbol in usdt_markets
+                    if symbol.split('/', 1)[0] not in EXCLUDED_BASES
                 ]
+                if len(filtered_markets) <= limit:
+                    # Semua market terpakai; volume (fetch_tickers multi-MB) tidak dibutuhkan
+                    return filtered_markets
                 try:
-                    tickers = self.exchange.fetch_tickers()
-                    filtered_markets.sort(key=lambda x: tickers[x]['quoteVolume'] if x in tickers else 0, reverse=True)
+                    tickers = self._fetch_all_tickers()
+                    # Sort volume di numpy (stable: volume sama tetap urutan markets)
+                    vols = np.fromiter(
+                        ((tickers.get(s) or {}).get('quoteVolume') or 0.0 for s in filtered_markets),
+                        dtype=np.float64, count=len(filtered_markets),
+                    )
+                    filtered_markets = [filtered_markets[i] for i in np.argsort(-vols, kind='stable')]
+                    self._ranked_cache = (time.monotonic(), filtered_markets)
                 except:
                     pass
                 return filtered_markets[:limit]
@@ -71,10 +368,66 @@ class CCXTDataProvider(DataProvider):
                 # ... (sama seperti sebelumnya)
             ]
 
+    def get_popular_coins(self, limit=15):
+        """Top `limit` pasangan /USDT menurut quoteVolume dari satu snapshot fetch_tickers.
+
+        Cukup argpartition (O(N)) lalu sort `limit` teratas, tanpa sort seluruh market.
+        """
+        try:
+            tickers = self._fetch_all_tickers()
+        except Exception as e:
+            print(f"Error getting tickers: {e}")
+            return self.get_popular_assets(limit)
+        syms = np.array([
+            s for s in tickers
+            if s.endswith('/USDT') and s.split('/', 1)[0] not in EXCLUDED_BASES
+        ])
+        if syms.size <= limit:
+            return syms.tolist()
+        vols = np.fromiter(
+            ((tickers[s] or {}).get('quoteVolume') or 0.0 for s in syms),
+            dtype=np.float64, count=syms.size,
+        )
+        top_idx = np.argpartition(-vols, limit)[:limit]
+        return syms[top_idx[np.argsort(-vols[top_idx], kind='stable')]].tolist()
+
+class AsyncCCXTDataProvider:
+    """Versi async CCXTDataProvider untuk scanner: banyak fetch_ohlcv in-flight di satu event loop"""
+    def __init__(self, exchange_id='binance', api_key='', secret='', session=None):
+        exchange_class = getattr(_import('ccxt.async_support'), exchange_id)
+        config = {
+            'apiKey': api_key,
+            'secret': secret,
+            'enableRateLimit': True,
+        }
+        if session is not None:
+            config['session'] = session  # aiohttp session milik bot, tidak ditutup di sini
+        self.exchange = exchange_class(config)
+
+    async def get_ohlcv_async(self, symbol, timeframe, limit=200):
+        ohlcv = await self.get_ohlcv_raw_async(symbol, timeframe, limit)
+        return _ohlcv_frame(ohlcv) if ohlcv is not None else None
+
+    async def get_ohlcv_raw_async(self, symbol, timeframe, limit=200):
+        """List ccxt [[ts, o, h, l, c, v], ...] apa adanya, untuk strategy.analyze_raw"""
+        try:
+            return await self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        except Exception as e:
+            print(f"Error getting data for {symbol}: {e}")
+            return None
+
+    async def close(self):
+        await self.exchange.close()
+
 class YFinanceDataProvider(DataProvider):
     def __init__(self, market_type='saham_id'):  # 'saham_id' or 'forex'
         self.market_type = market_type
+        # yfinance >= 0.2.58 hanya menerima session curl_cffi; satu session = koneksi dipakai ulang
+        self._yf = _import('yfinance')
+        self._session = _import('curl_cffi.requests').Session(impersonate="chrome")
+        self._init_caches()
         
+    @_cached_ohlcv
     def get_ohlcv(self, symbol, timeframe='1h', limit=200):
         try:
             # Map timeframe yfinance: '1h', '2h', '1d', etc.
@@ -89,7 +442,7 @@ class YFinanceDataProvider(DataProvider):
             else:
                 period = '1y'
             
-            ticker = yf.Ticker(symbol)
+            ticker = self._yf.Ticker(symbol, session=self._session)
             df = ticker.history(period=period, interval=interval)
             if len(df) > limit:
                 df = df.tail(limit)
@@ -98,24 +451,50 @@ class YFinanceDataProvider(DataProvider):
             if 'datetime' in df.columns:
                 df.rename(columns={'datetime': 'timestamp'}, inplace=True)
             df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-            return df
+            return df.astype({col: OHLCV_DTYPE for col in PRICE_COLUMNS}, copy=False)
         except Exception as e:
             print(f"Error getting data for {symbol}: {e}")
             return None
-            
+
+    @_cached_ticker
     def get_ticker(self, symbol):
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            hist = ticker.history(period='1d', interval='1m')  # Latest price
-            if not hist.empty:
-                last_price = hist['close'].iloc[-1]
-            else:
-                last_price = info.get('regularMarketPrice', 0)
-            return {'last': last_price, 'volume': info.get('volume', 0)}
+            # Tanpa ticker.info (~100KB JSON): harga & volume diambil dari candle terakhir
+            hist = self._yf.Ticker(symbol, session=self._session).history(period='1d', interval='1m')
+            if hist.empty:
+                hist = self._yf.download(symbol, period='1d', interval='1d', progress=False,
+                                   multi_level_index=False, session=self._session)
+            if hist.empty:
+                return None
+            return {'last': float(hist['Close'].iloc[-1]), 'volume': float(hist['Volume'].iloc[-1])}
         except Exception as e:
             print(f"Error getting ticker for {symbol}: {e}")
             return None
+
+    def get_tickers(self, symbols):
+        # yf.download mengambil semua simbol dalam satu batch (threaded)
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        try:
+            data = self._yf.download(
+                symbols, period='1d', interval='1m',
+                group_by='ticker', threads=True, progress=False,
+                session=self._session,
+            )
+            tickers = {}
+            for symbol in symbols:
+                frame = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+                frame = frame.dropna(subset=['Close'])
+                if not frame.empty:
+                    tickers[symbol] = {
+                        'last': float(frame['Close'].iloc[-1]),
+                        'volume': float(frame['Volume'].sum()),
+                    }
+            return tickers
+        except Exception as e:
+            print(f"Error getting tickers for {symbols}: {e}")
+            return {}
             
     def get_popular_assets(self, limit=50):
         if self.market_type == 'saham_id':
@@ -132,12 +511,13 @@ class YFinanceDataProvider(DataProvider):
 class SolanaPumpFunProvider:
     # Sama seperti sebelumnya, tidak berubah
     def __init__(self, rpc_url):
-        self.client = Client(rpc_url)
+        self.client = _import('solana.rpc.api').Client(rpc_url)
         self.program_id = "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"
     
-    async def monitor_new_tokens(self, limit=10):
+    async def monitor_new_tokens(self, limit=10, http=None):
         results = []
         try:
+            connect = _import('solana.rpc.websocket_api').connect
             async with connect(self.client._provider.endpoint_uri + "/") as websocket:
                 await websocket.logs_subscribe(
                     {"mentions": [self.program_id]},
@@ -147,7 +527,7 @@ class SolanaPumpFunProvider:
                     if "create" in str(msg.result.value.logs):  # Simplified
                         token_mint = self.extract_token_mint(msg)
                         if token_mint:
-                            ticker = await self.get_solana_ticker(token_mint)
+                            ticker = await self.get_solana_ticker(token_mint, http)
                             results.append({'symbol': token_mint, 'ticker': ticker})
                             if len(results) >= limit:
                                 break
@@ -159,6 +539,6 @@ class SolanaPumpFunProvider:
         # Placeholder (real: parse logs)
         return "EXAMPLE_MINT_TOKEN"
     
-    async def get_solana_ticker(self, mint):
-        # Placeholder (real: Birdeye/Dexscreener API)
+    async def get_solana_ticker(self, mint, http=None):
+        # Placeholder (real: Birdeye/Dexscreener API via `http`, aiohttp session milik bot)
         return {'last': 0.001, 'volume': 10000}
\ No newline at end of file
@@ -14,19 +14,24 @@ class Notifier:
 
 
 class SoundNotifier(Notifier):
+    def __init__(self):
+        # Bind sekali; play_alert tidak perlu lookup atribut modul tiap panggilan
+        self._beep = winsound.Beep if IS_WINDOWS else None
+
     def play_alert(self, alert_type="alert"):
+        beep = self._beep
         try:
-            if IS_WINDOWS:
+            if beep is not None:
                 if alert_type == "profit":
-                    winsound.Beep(1000, 500)
-                    winsound.Beep(1200, 300)
+                    beep(1000, 500)
+                    beep(1200, 300)
                 elif alert_type == "loss":
-                    winsound.Beep(400, 800)
-                    winsound.Beep(300, 500)
+                    beep(400, 800)
+                    beep(300, 500)
                 elif alert_type == "alert":
-                    winsound.Beep(800, 300)
+                    beep(800, 300)
                     time.sleep(0.1)
-                    winsound.Beep(800, 300)
+                    beep(800, 300)
             else:
                 # Fallback di Linux/Cloud
                 print(f"🔔 Alert triggered: {alert_type} (no sound on this OS)")
@@ -1,15 +1,82 @@
-import pandas as pd
 import numpy as np
 from abc import ABC, abstractmethod
-import warnings
-warnings.filterwarnings('ignore')
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
 
 try:
     import talib
     TALIB_AVAILABLE = True
 except ImportError:
     TALIB_AVAILABLE = False
-    print("Warning: TA-LIB not available, using simple calculations")
+    print("Warning: TA-LIB not available, using built-in indicator kernels")
+
+from ._ta_kernels import (
+    ema_last, rsi_last, rsi_state, rsi_from_avgs, atr_last, pattern_flags, signal_scores,
+    batch_signals,
+)
+
+# Fungsi indikator di-resolve sekali saat import: (array..., period) -> nilai terakhir
+if TALIB_AVAILABLE:
+    _TA_EMA, _TA_RSI, _TA_ATR = talib.EMA, talib.RSI, talib.ATR
+
+    def _EMA(c, span):
+        return _TA_EMA(c, span)[-1]
+
+    def _RSI(c, period):
+        return _TA_RSI(c, period)[-1]
+
+    def _ATR(h, l, c, period):
+        return _TA_ATR(h, l, c, period)[-1]
+else:
+    _EMA, _RSI, _ATR = ema_last, rsi_last, atr_last
+
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+PATTERN_PERIOD = 20
+HARMONIC_PERIOD = 50
+VOLUME_PERIOD = 20  # rata-rata volume pembanding volume_ratio
+# Urutan flag dari pattern_flags(): triangle, channel/wedge, harmonic (masing-masing 5)
+TRIANGLE_KEYS = ('symmetrical_triangle', 'ascending_triangle', 'descending_triangle',
+                 'broadening_ascending', 'broadening_descending')
+CHANNEL_WEDGE_KEYS = ('uptrend_channel', 'downtrend_channel', 'ranging_channel',
+                      'rising_wedge', 'falling_wedge')
+HARMONIC_KEYS = ('gartley', 'bat', 'butterfly', 'crab', 'shark')
+PATTERN_KEYS = TRIANGLE_KEYS + CHANNEL_WEDGE_KEYS + HARMONIC_KEYS
+# Bobot pattern_score per flag, urutan sama dengan PATTERN_KEYS
+PATTERN_WEIGHTS = np.array([
+    1, 3, -3, 0, 0,    # symmetrical (continuation), ascending (bullish), descending (bearish), broadening
+    2, -2, 0, -2, 2,   # up/down channel, ranging, rising wedge (bearish), falling wedge (bullish)
+    1, 1, 1, 1, 1,     # harmonic: boost kecil
+], dtype=np.int8)
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+LEVEL_KEYS = ('ideal_entry', 'entry_low', 'entry_high', 'tp1', 'tp2', 'tp3', 'sl')
+_NONE_LEVELS = dict.fromkeys(LEVEL_KEYS)  # sinyal NEUTRAL: tanpa level entry/TP/SL
+STREAM_WINDOW = 50  # bar terakhir yang disimpan StreamingState (= minimum analyze)
+
+def _f64(series):
+    """Kolom sebagai array float64 contiguous untuk TA-Lib / kernel (provider kirim float32)"""
+    return np.ascontiguousarray(series.values, dtype=np.float64)
+
+def _ohlcv_arrays(df):
+    """(open, high, low, close, volume) sebagai array float64, diambil sekali per analyze"""
+    return tuple(_f64(df[col]) for col in OHLCV_COLUMNS)
+
+def _bar(df, i):
+    """Satu bar (open, high, low, close, volume) sebagai float, tanpa copy frame"""
+    return tuple(float(df[col].values[i]) for col in OHLCV_COLUMNS)
+
+@dataclass
+class StreamingState:
+    """State indikator satu simbol untuk analyze_incremental: update O(1) per bar baru"""
+    ema13: float
+    ema21: float
+    rsi_avg_gain: float
+    rsi_avg_loss: float
+    atr: float
+    prev_close: float
+    bars: deque  # STREAM_WINDOW bar terakhir (open, high, low, close, volume) untuk pola
+    last_ts: object = None  # timestamp bar terakhir di state (cache per simbol di analyze)
 
 class TradingStrategy(ABC):
     @abstractmethod
@@ -20,274 +87,231 @@ class TechnicalAnalysisStrategy(TradingStrategy):
     def __init__(self, atr_multiplier=1.0, entry_range_pct=0.02):
         self.atr_multiplier = atr_multiplier
         self.entry_range_pct = entry_range_pct
+        self._states = {}  # (symbol, timeframe) -> StreamingState sampai bar closed terakhir
+        # Satu strategy dipakai bersama thread scan, scheduler dan sesi Streamlit: state yang
+        # tersimpan tidak pernah diubah di tempat, bar baru diterapkan ke salinan lalu di-swap
+        self._states_lock = threading.Lock()
     
-    def identify_hh_hl_lh_ll(self, df, lookback=20):
-        """Identify Higher High, Higher Low, Lower High, Lower Low patterns"""
-        highs = df['high'].tail(lookback)
-        lows = df['low'].tail(lookback)
-        
-        # Initialize patterns
-        hh = hl = lh = ll = False
-        
-        # Check for HH/HL (uptrend)
-        if len(highs) >= 5:
-            # Higher High: current high > previous high
-            if highs.iloc[-1] > highs.iloc[-2] > highs.iloc[-3]:
-                hh = True
-            
-            # Higher Low: current low > previous low
-            if lows.iloc[-1] > lows.iloc[-2] > lows.iloc[-3]:
-                hl = True
-        
-        # Check for LH/LL (downtrend)
-        if len(highs) >= 5:
-            # Lower High: current high < previous high
-            if highs.iloc[-1] < highs.iloc[-2] < highs.iloc[-3]:
-                lh = True
-            
-            # Lower Low: current low < previous low
-            if lows.iloc[-1] < lows.iloc[-2] < lows.iloc[-3]:
-                ll = True
+    def identify_hh_hl_lh_ll(self, h, l):
+        """Identify Higher High, Higher Low, Lower High, Lower Low patterns (3 bar terakhir)"""
+        if len(h) < 3:
+            return False, False, False, False
+        
+        h0, h1, h2 = h[-1], h[-2], h[-3]
+        l0, l1, l2 = l[-1], l[-2], l[-3]
+        
+        # bool() supaya hasil tetap bool Python (disimpan ke JSON/DB), bukan np.bool_
+        hh = bool(h0 > h1 > h2)  # Higher High (uptrend)
+        hl = bool(l0 > l1 > l2)  # Higher Low
+        lh = bool(h0 < h1 < h2)  # Lower High (downtrend)
+        ll = bool(l0 < l1 < l2)  # Lower Low
                 
         return hh, hl, lh, ll
     
-    def analyze_ema_cross(self, df):
+    def analyze_ema_cross(self, c):
         """Analyze EMA 13 and EMA 21 crossover"""
-        if len(df) < 22:  # Need enough data for EMA 21
+        if len(c) < 22:  # Need enough data for EMA 21
             return "NEUTRAL", 0
             
         # Calculate EMAs
-        ema_13 = talib.EMA(df['close'], timeperiod=13) if TALIB_AVAILABLE else df['close'].ewm(span=13).mean()
-        ema_21 = talib.EMA(df['close'], timeperiod=21) if TALIB_AVAILABLE else df['close'].ewm(span=21).mean()
+        ema_13 = _EMA(c, 13)
+        ema_21 = _EMA(c, 21)
         
         # Check crossover
-        ema_trend = "BULLISH" if ema_13.iloc[-1] > ema_21.iloc[-1] else "BEARISH"
+        ema_trend = "BULLISH" if ema_13 > ema_21 else "BEARISH"
         ema_score = 1 if ema_trend == "BULLISH" else -1
         
         return ema_trend, ema_score
     
     def calculate_atr(self, df):
         """Calculate ATR for the given dataframe"""
-        if len(df) < 14:
+        return self._atr(_f64(df['high']), _f64(df['low']), _f64(df['close']))
+    
+    def _atr(self, h, l, c):
+        if len(c) <= ATR_PERIOD:
             return 0.0
-        if TALIB_AVAILABLE:
-            atr = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
-            return atr.iloc[-1] if not np.isnan(atr.iloc[-1]) else 0.0
-        else:
-            # Fallback pandas calculation
-            high_low = df['high'] - df['low']
-            high_close = np.abs(df['high'] - df['close'].shift())
-            low_close = np.abs(df['low'] - df['close'].shift())
-            ranges = pd.concat([high_low, high_close, low_close], axis=1)
-            true_range = np.max(ranges, axis=1)
-            atr = true_range.rolling(14).sum() / 14
-            return atr.iloc[-1] if not np.isnan(atr.iloc[-1]) else 0.0
+        atr = _ATR(h, l, c, ATR_PERIOD)
+        return float(atr) if not np.isnan(atr) else 0.0
+    
+    def detect_patterns(self, h, l, c, period=PATTERN_PERIOD, harmonic_period=HARMONIC_PERIOD):
+        """Semua pola (triangle, channel/wedge, harmonic) dari satu kernel -> {nama: bool}"""
+        flags = pattern_flags(h, l, c, period, harmonic_period)
+        return dict(zip(PATTERN_KEYS, flags.tolist()))
     
-    def detect_triangle_patterns(self, df, period=20):
+    def detect_triangle_patterns(self, h, l, c, period=PATTERN_PERIOD):
         """Detect various triangle patterns"""
-        patterns = {
-            'symmetrical_triangle': False,
-            'ascending_triangle': False,
-            'descending_triangle': False,
-            'broadening_ascending': False,
-            'broadening_descending': False
-        }
-        
-        if len(df) < period * 2:
-            return patterns
-            
-        # Get recent highs and lows
-        highs = df['high'].tail(period)
-        lows = df['low'].tail(period)
-        
-        # Calculate trendlines for highs and lows
-        high_slope = np.polyfit(range(len(highs)), highs, 1)[0]
-        low_slope = np.polyfit(range(len(lows)), lows, 1)[0]
-        
-        # Symmetrical Triangle: converging trendlines with similar slopes
-        if abs(high_slope) > 0 and abs(low_slope) > 0:
-            if high_slope < 0 and low_slope > 0 and abs(high_slope/low_slope) < 1.5:
-                patterns['symmetrical_triangle'] = True
-        
-        # Ascending Triangle: horizontal resistance, rising support
-        high_std = np.std(highs)
-        if high_std < np.std(highs) * 0.7 and low_slope > 0:
-            patterns['ascending_triangle'] = True
-        
-        # Descending Triangle: horizontal support, falling resistance
-        low_std = np.std(lows)
-        if low_std < np.std(lows) * 0.7 and high_slope < 0:
-            patterns['descending_triangle'] = True
-            
-        # Broadening patterns (expanding volatility)
-        if high_slope > 0 and low_slope < 0:
-            patterns['broadening_ascending'] = True
-        elif high_slope < 0 and low_slope > 0:
-            patterns['broadending_descending'] = True
-            
-        return patterns
+        patterns = self.detect_patterns(h, l, c, period=period)
+        return {k: patterns[k] for k in TRIANGLE_KEYS}
     
-    def detect_channel_wedge_patterns(self, df, period=20):
+    def detect_channel_wedge_patterns(self, h, l, c, period=PATTERN_PERIOD):
         """Detect channel and wedge patterns"""
-        patterns = {
-            'uptrend_channel': False,
-            'downtrend_channel': False,
-            'ranging_channel': False,
-            'rising_wedge': False,
-            'falling_wedge': False
-        }
-        
-        if len(df) < period * 2:
-            return patterns
-            
-        highs = df['high'].tail(period)
-        lows = df['low'].tail(period)
-        closes = df['close'].tail(period)
-        
-        # Calculate regression channels
-        high_slope = np.polyfit(range(len(highs)), highs, 1)[0]
-        low_slope = np.polyfit(range(len(lows)), lows, 1)[0]
-        close_slope = np.polyfit(range(len(closes)), closes, 1)[0]
-        
-        # Uptrend Channel: both highs and lows trending up
-        if high_slope > 0 and low_slope > 0 and close_slope > 0:
-            patterns['uptrend_channel'] = True
-            
-        # Downtrend Channel: both highs and lows trending down
-        if high_slope < 0 and low_slope < 0 and close_slope < 0:
-            patterns['downtrend_channel'] = True
-            
-        # Ranging Channel: minimal slope with consistent range
-        if abs(high_slope) < 0.001 and abs(low_slope) < 0.001:
-            patterns['ranging_channel'] = True
-            
-        # Rising Wedge: highs rising faster than lows
-        if high_slope > 0 and low_slope > 0 and high_slope > low_slope * 1.5:
-            patterns['rising_wedge'] = True
-            
-        # Falling Wedge: lows falling faster than highs
-        if high_slope < 0 and low_slope < 0 and abs(low_slope) > abs(high_slope) * 1.5:
-            patterns['falling_wedge'] = True
-            
-        return patterns
+        patterns = self.detect_patterns(h, l, c, period=period)
+        return {k: patterns[k] for k in CHANNEL_WEDGE_KEYS}
     
-    def detect_harmonic_patterns(self, df, period=50):
+    def detect_harmonic_patterns(self, h, l, c, period=HARMONIC_PERIOD):
         """Simplified harmonic pattern detection"""
-        patterns = {
-            'gartley': False,
-            'bat': False,
-            'butterfly': False,
-            'crab': False,
-            'shark': False
-        }
-        
-        if len(df) < period:
-            return patterns
-            
-        # This is a simplified version - real harmonic pattern detection
-        # requires complex Fibonacci retracement calculations
-        closes = df['close'].tail(period)
-        price_change = (closes.iloc[-1] - closes.iloc[0]) / closes.iloc[0]
-        
-        # Very basic pattern detection based on price movements
-        # In a real implementation, this would use proper Fibonacci ratios
-        if abs(price_change) < 0.05:  # Small price change
-            patterns['gartley'] = True
-        elif 0.05 <= abs(price_change) < 0.1:
-            patterns['bat'] = True
-        elif 0.1 <= abs(price_change) < 0.15:
-            patterns['butterfly'] = True
-        elif 0.15 <= abs(price_change) < 0.2:
-            patterns['crab'] = True
-        else:
-            patterns['shark'] = True
-            
-        return patterns
+        patterns = self.detect_patterns(h, l, c, harmonic_period=period)
+        return {k: patterns[k] for k in HARMONIC_KEYS}
     
-    def analyze(self, df):
-        """Main analysis method with enhanced pattern recognition"""
+    def analyze(self, df, symbol=None, timeframe=None):
+        """Main analysis method with enhanced pattern recognition.
+
+        Dengan `symbol`, state indikator disimpan per (simbol, timeframe): bar yang sama/baru
+        cukup diupdate O(1) lewat analyze_incremental, bukan dihitung ulang dari awal.
+        """
         if len(df) < 50:
             return None
+        if symbol is not None and 'timestamp' in df:
+            return self._analyze_cached(df, symbol, timeframe)
         
-        current_close = df['close'].iloc[-1]
-        
+        # Kolom -> array float64 sekali; semua helper & kernel bekerja di array ini
+        o, h, l, c, v = _ohlcv_arrays(df)
+        return self._analyze_arrays(h, l, c, v)
+    
+    def analyze_raw(self, ohlcv):
+        """Analyze langsung dari list ccxt [[ts, o, h, l, c, v], ...] tanpa DataFrame perantara.
+
+        Harga tetap float64 penuh (tanpa cast float32 seperti frame provider), jadi angka bisa
+        berbeda di digit terakhir dibanding analyze(df) atas data yang sama.
+        """
+        if len(ohlcv) < 50:
+            return None
+        # Satu konversi list -> array, lalu baris high/low/close/volume contiguous untuk kernel
+        arr = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        h, l, c, v = np.ascontiguousarray(arr[:, 2:].T)
+        return self._analyze_arrays(h, l, c, v)
+    
+    def _analyze_arrays(self, h, l, c, v):
         # Calculate RSI with fallback
-        if TALIB_AVAILABLE:
-            current_rsi = talib.RSI(df['close'], timeperiod=14).iloc[-1]
-        else:
-            # Simple RSI fallback
-            price_diff = df['close'].diff()
-            gain = price_diff.where(price_diff > 0, 0).rolling(14).mean()
-            loss = -price_diff.where(price_diff < 0, 0).rolling(14).mean()
-            rs = gain / loss
-            current_rsi = 100 - (100 / (1 + rs)).iloc[-1] if not np.isnan(rs.iloc[-1]) and loss.iloc[-1] != 0 else 50
+        current_rsi = _RSI(c, RSI_PERIOD)
         
         # Get ATR
-        atr = self.calculate_atr(df)
-        
-        # Pattern analysis
-        hh, hl, lh, ll = self.identify_hh_hl_lh_ll(df)
+        atr = self._atr(h, l, c)
         
         # EMA analysis
-        ema_trend, ema_score = self.analyze_ema_cross(df)
-        
-        # Volume ratio
-        vol_mean = df['volume'].rolling(20).mean().iloc[-1]
-        volume_ratio = df['volume'].iloc[-1] / vol_mean if vol_mean > 0 else 1
+        ema_trend, ema_score = self.analyze_ema_cross(c)
         
-        # Enhanced pattern detection
-        triangle_patterns = self.detect_triangle_patterns(df)
-        channel_wedge_patterns = self.detect_channel_wedge_patterns(df)
-        harmonic_patterns = self.detect_harmonic_patterns(df)
-        
-        # Trend determination
-        trend_score = 0
-        if hh or hl:
-            trend_score += 2  # Bullish pattern
-        if lh or ll:
-            trend_score -= 2  # Bearish pattern
-        if ema_trend == "BULLISH":
-            trend_score += ema_score
-        else:
-            trend_score += ema_score
-        
-        # Pattern-based scoring
-        pattern_score = 0
-        
-        # Triangle patterns
-        if triangle_patterns['ascending_triangle']:
-            pattern_score += 3  # Bullish pattern
-        if triangle_patterns['descending_triangle']:
-            pattern_score -= 3  # Bearish pattern
-        if triangle_patterns['symmetrical_triangle']:
-            pattern_score += 1  # Neutral but often continuation
-            
-        # Channel patterns
-        if channel_wedge_patterns['uptrend_channel']:
-            pattern_score += 2
-        if channel_wedge_patterns['downtrend_channel']:
-            pattern_score -= 2
-        if channel_wedge_patterns['falling_wedge']:
-            pattern_score += 2  # Bullish reversal
-        if channel_wedge_patterns['rising_wedge']:
-            pattern_score -= 2  # Bearish reversal
-            
-        # Harmonic patterns (simplified scoring)
-        for pattern, detected in harmonic_patterns.items():
-            if detected:
-                pattern_score += 1  # All harmonic patterns get a small boost
+        return self._compose(h, l, c, v, current_rsi, atr, ema_trend, ema_score)
+    
+    def analyze_batch(self, ohlcv):
+        """Analyze banyak simbol sekaligus: ohlcv (n_symbols, n_bars, 5) [open, high, low, close, volume].
+
+        Semua simbol harus punya jumlah bar sama (mis. backtest / fetch dengan limit sama).
+        Indikator + scoring jalan paralel per simbol di satu kernel; return list dict / None.
+        """
+        ohlcv = np.asarray(ohlcv)
+        if ohlcv.shape[1] < 50:
+            return [None] * ohlcv.shape[0]
+        
+        # AoS (simbol, bar, kolom) -> SoA: tiap kolom (simbol, bar) contiguous per simbol
+        o, h, l, c, v = np.ascontiguousarray(np.moveaxis(ohlcv, 2, 0), dtype=np.float64)
+        (rsi, atr, ema13, ema21, volume_ratio, ints, flags) = batch_signals(
+            h, l, c, v, PATTERN_WEIGHTS, RSI_PERIOD, ATR_PERIOD,
+            PATTERN_PERIOD, HARMONIC_PERIOD, VOLUME_PERIOD,
+        )
+        
+        results = []
+        for i in range(ohlcv.shape[0]):
+            hh, hl, lh, ll, structure_score, pattern_score, rsi_score, volume_score = ints[i].tolist()
+            ema_trend = "BULLISH" if ema13[i] > ema21[i] else "BEARISH"
+            ema_score = 1 if ema_trend == "BULLISH" else -1
+            scores = (hh, hl, lh, ll, volume_ratio[i], structure_score, pattern_score,
+                      rsi_score, volume_score, flags[i])
+            atr_i = float(atr[i]) if not np.isnan(atr[i]) else 0.0
+            results.append(self._result(c[i, -1], rsi[i], atr_i, ema_trend, ema_score, scores))
+        return results
+    
+    def init_state(self, df):
+        """Bangun StreamingState dari histori penuh sekali; bar berikutnya lewat analyze_incremental"""
+        o, h, l, c, v = _ohlcv_arrays(df)
+        gain, loss = rsi_state(c, RSI_PERIOD)
+        atr = atr_last(h, l, c, ATR_PERIOD)
+        tail = zip(*(x[-STREAM_WINDOW:].tolist() for x in (o, h, l, c, v)))
+        return StreamingState(
+            ema13=ema_last(c, 13),
+            ema21=ema_last(c, 21),
+            rsi_avg_gain=gain,
+            rsi_avg_loss=loss,
+            atr=atr if not np.isnan(atr) else 0.0,
+            prev_close=float(c[-1]),
+            bars=deque(tail, maxlen=STREAM_WINDOW),
+        )
+    
+    def _analyze_cached(self, df, symbol, timeframe=None):
+        """analyze() lewat state per (simbol, timeframe). Bar terakhir dianggap masih berjalan
+        (harganya berubah tiap fetch), jadi state hanya memuat bar closed dan bar terakhir
+        diterapkan ke salinannya. Cold start / gap -> bangun ulang dari df."""
+        ts = df['timestamp'].values
+        # Tanpa timeframe eksplisit, jarak antar bar membedakan seri timeframe lain
+        key = (symbol, timeframe if timeframe is not None else ts[-1] - ts[-2])
+        with self._states_lock:
+            state = self._states.get(key)
+            if state is not None and state.last_ts == ts[-3]:
+                # Satu candle baru: bar sebelumnya sekarang closed
+                state = self._copy_state(state)
+                self._advance(state, _bar(df, -2))
+                state.last_ts = ts[-2]
+                self._states[key] = state
+            elif state is not None and state.last_ts != ts[-2]:
+                state = None
+        if state is None:
+            state = self.init_state(df.iloc[:-1])
+            state.last_ts = ts[-2]
+            with self._states_lock:
+                self._states[key] = state
+        
+        return self.analyze_incremental(_bar(df, -1), self._copy_state(state))
+    
+    def _copy_state(self, state):
+        """Salinan StreamingState yang boleh di-advance tanpa mengubah aslinya"""
+        return replace(state, bars=deque(state.bars, maxlen=STREAM_WINDOW))
+    
+    def analyze_incremental(self, new_bar, state):
+        """Analyze satu bar baru (open, high, low, close, volume) dengan update O(1) atas state"""
+        self._advance(state, new_bar)
+        if len(state.bars) < STREAM_WINDOW:
+            return None
         
-        # RSI score
-        rsi_score = 0
-        if 30 < current_rsi < 70:
-            rsi_score = 1
-        elif current_rsi < 30:
-            rsi_score = 2  # Oversold - good for LONG
-        elif current_rsi > 70:
-            rsi_score = -2  # Overbought - good for SHORT
+        ema_trend = "BULLISH" if state.ema13 > state.ema21 else "BEARISH"
+        ema_score = 1 if ema_trend == "BULLISH" else -1
+        current_rsi = rsi_from_avgs(state.rsi_avg_gain, state.rsi_avg_loss)
+        # (5, STREAM_WINDOW) row-major: tiap kolom OHLCV jadi baris contiguous
+        _, wh, wl, wc, wv = np.array(state.bars, dtype=np.float64).T.copy()
+        return self._compose(wh, wl, wc, wv, current_rsi, state.atr, ema_trend, ema_score)
+    
+    def _advance(self, state, new_bar):
+        """Terapkan satu bar ke state: rekursi EMA/Wilder, tanpa menghitung ulang histori"""
+        o, h, l, c, v = (float(x) for x in new_bar)
+        pc = state.prev_close
+        
+        # EMA: ema += a * (x - ema)
+        state.ema13 += 2.0 / 14.0 * (c - state.ema13)
+        state.ema21 += 2.0 / 22.0 * (c - state.ema21)
+        
+        # RSI / ATR Wilder
+        d = c - pc
+        state.rsi_avg_gain = (state.rsi_avg_gain * (RSI_PERIOD - 1) + max(d, 0.0)) / RSI_PERIOD
+        state.rsi_avg_loss = (state.rsi_avg_loss * (RSI_PERIOD - 1) + max(-d, 0.0)) / RSI_PERIOD
+        tr = max(h - l, abs(h - pc), abs(l - pc))
+        state.atr = (state.atr * (ATR_PERIOD - 1) + tr) / ATR_PERIOD
+        
+        state.prev_close = c
+        state.bars.append((o, h, l, c, v))
+    
+    def _compose(self, h, l, c, v, current_rsi, atr, ema_trend, ema_score):
+        """Pola, scoring dan dict hasil di atas indikator yang sudah dihitung"""
+        # HH/HL, volume, pola dan skor RSI dalam satu kernel
+        scores = signal_scores(h, l, c, v, float(current_rsi), PATTERN_WEIGHTS,
+                               PATTERN_PERIOD, HARMONIC_PERIOD, VOLUME_PERIOD)
+        return self._result(c[-1], current_rsi, atr, ema_trend, ema_score, scores)
+    
+    def _result(self, current_close, current_rsi, atr, ema_trend, ema_score, scores):
+        """Dict sinyal dari indikator + output signal_scores()"""
+        (hh, hl, lh, ll, volume_ratio, structure_score, pattern_score, rsi_score,
+         volume_score, flags) = scores
         
-        # Volume score
-        volume_score = 1 if volume_ratio > 1.2 else 0 if volume_ratio > 0.8 else -1
+        # Trend determination: struktur harga + arah EMA (+1 / -1)
+        trend_score = structure_score + ema_score
         
         # Total score with pattern enhancement
         score = trend_score + rsi_score + volume_score + pattern_score
@@ -295,51 +319,46 @@ class TechnicalAnalysisStrategy(TradingStrategy):
         # Determine action
         action = "LONG" if score > 0 else "SHORT" if score < 0 else "NEUTRAL"
         
-        # Calculate entry levels if action is LONG or SHORT
-        if action in ["LONG", "SHORT"]:
-            ideal_entry = current_close
-            entry_low = ideal_entry * (1 - self.entry_range_pct)
-            entry_high = ideal_entry * (1 + self.entry_range_pct)
-            if action == "LONG":
-                tp1 = ideal_entry + atr * self.atr_multiplier
-                tp2 = ideal_entry + atr * self.atr_multiplier * 2
-                tp3 = ideal_entry + atr * self.atr_multiplier * 3
-                sl = ideal_entry - atr * self.atr_multiplier
-            elif action == "SHORT":
-                tp1 = ideal_entry - atr * self.atr_multiplier
-                tp2 = ideal_entry - atr * self.atr_multiplier * 2
-                tp3 = ideal_entry - atr * self.atr_multiplier * 3
-                sl = ideal_entry + atr * self.atr_multiplier
+        current_close = float(current_close)
+        
+        # Calculate entry levels if action is LONG or SHORT (semua sudah float Python)
+        if action != "NEUTRAL":
+            side = 1.0 if action == "LONG" else -1.0  # TP searah posisi, SL berlawanan
+            step = side * atr * self.atr_multiplier
+            levels = dict(zip(LEVEL_KEYS, (
+                current_close,
+                current_close * (1 - self.entry_range_pct),
+                current_close * (1 + self.entry_range_pct),
+                current_close + step,
+                current_close + step * 2,
+                current_close + step * 3,
+                current_close - step,
+            )))
         else:
-            ideal_entry = entry_low = entry_high = tp1 = tp2 = tp3 = sl = None
+            levels = _NONE_LEVELS
         
         # Compile pattern information
-        all_patterns = {**triangle_patterns, **channel_wedge_patterns, **harmonic_patterns}
-        detected_patterns = [pattern for pattern, detected in all_patterns.items() if detected]
+        all_patterns = dict(zip(PATTERN_KEYS, flags.tolist()))
+        detected_patterns = [PATTERN_KEYS[i] for i in np.flatnonzero(flags)]
         
         # Result
         result = {
             'action': action,
-            'ideal_entry': float(ideal_entry) if ideal_entry is not None else None,
-            'entry_low': float(entry_low) if entry_low is not None else None,
-            'entry_high': float(entry_high) if entry_high is not None else None,
-            'tp1': float(tp1) if tp1 is not None else None,
-            'tp2': float(tp2) if tp2 is not None else None,
-            'tp3': float(tp3) if tp3 is not None else None,
-            'sl': float(sl) if sl is not None else None,
-            'current_price': float(current_close),
+            **levels,
+            'current_price': current_close,
             'rsi': float(current_rsi),
             'trend': 'BULLISH' if trend_score > 0 else 'BEARISH' if trend_score < 0 else 'NEUTRAL',
             'volume_ratio': float(volume_ratio),
             'score': int(score),
             'atr': float(atr),
-            'hh': hh,
-            'hl': hl,
-            'lh': lh,
-            'll': ll,
+            # bool()/int(): tanpa numba kernel mengembalikan skalar NumPy
+            'hh': bool(hh),
+            'hl': bool(hl),
+            'lh': bool(lh),
+            'll': bool(ll),
             'ema_trend': ema_trend,
             'ema_score': ema_score,
-            'pattern_score': pattern_score,
+            'pattern_score': int(pattern_score),
             'detected_patterns': detected_patterns,
             'pattern_details': all_patterns
         }
@@ -1,15 +1,122 @@
 import ccxt
-import time
+import ccxt.pro as ccxtpro
 import threading
-import json
-import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import numpy as np
+import pandas as pd
+import sys
 from datetime import datetime
-from .strategies import TechnicalAnalysisStrategy
-from .data_provider import CCXTDataProvider
+from .strategies import TechnicalAnalysisStrategy, ATR_PERIOD, _ohlcv_arrays
+from ._ta_kernels import atr_last
+from ._perf import json_loads, json_dumps, write_atomic
+from .data_provider import CCXTDataProvider, AsyncCCXTDataProvider, OHLCVCache
 from .notifier import SoundNotifier
 from database.db_handler import DatabaseHandler
 
-warnings.filterwarnings('ignore')
+LEVEL_KINDS = ('SL', 'TP1', 'TP2', 'TP3')  # urutan kolom PositionsSoA.levels
+# Satu blok per koin di menu 1 (format sekali per record, satu write untuk semua)
+TOP_COIN_TEMPLATE = (
+    "\n{i}. {symbol} - {action} (Score: {score}/5)\n"
+    "   Range Entry: {entry_low:.4f} - {entry_high:.4f}\n"
+    "   TP1: {tp1:.4f} | TP2: {tp2:.4f} | TP3: {tp3:.4f}\n"
+    "   SL: {sl:.4f}\n"
+    "   RSI: {rsi:.2f} | Trend: {trend}\n"
+    "   Volume: {volume_ratio:.2f}x rata-rata"
+)
+MAX_BACKOFF = 60.0  # detik, batas jeda retry monitor setelah error beruntun
+
+
+def make_checker(sl, tp1, tp2, tp3, sign):
+    """Cek level satu posisi dengan SL/TP sebagai konstanta closure (level tidak berubah setelah entry).
+
+    Return sama seperti PositionsSoA._levels_hit sebelum filter TP yang sudah di-alert:
+    -1 tidak ada, 0 SL, 1-3 TP tertinggi yang tercapai.
+    """
+    def check(px):
+        if (px - sl) * sign <= 0:
+            return 0
+        if (px - tp3) * sign >= 0:
+            return 3
+        if (px - tp2) * sign >= 0:
+            return 2
+        if (px - tp1) * sign >= 0:
+            return 1
+        return -1
+    return check
+
+
+class PositionsSoA:
+    """Level SL/TP semua posisi yang dimonitor sebagai array paralel (struct-of-arrays).
+
+    Baris i milik symbols[i]; cek SL/TP untuk semua posisi cukup beberapa operasi vektor.
+    """
+    def __init__(self):
+        self.symbols = []
+        self.idx = {}
+        self.levels = np.empty((0, 4))  # SL, TP1, TP2, TP3
+        self.sign = np.empty(0)  # +1 LONG (untung saat harga naik), -1 SHORT
+        self.price = np.empty(0)
+        self.hit = np.zeros((0, 4), dtype=bool)  # TP1/TP2 yang sudah di-alert
+        self.checks = []  # make_checker per baris, untuk update satu simbol per tick websocket
+
+    def add(self, symbol, position):
+        row = np.array([position['sl'], position['tp1'], position['tp2'], position['tp3']], dtype=np.float64)
+        sign = 1.0 if position['action'] == 'LONG' else -1.0
+        hit = (False, bool(position.get('tp1_hit')), bool(position.get('tp2_hit')), False)
+        check = make_checker(*row.tolist(), sign)
+        i = self.idx.get(symbol)
+        if i is None:
+            self.idx[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.checks.append(check)
+            self.levels = np.vstack((self.levels, row))
+            self.sign = np.append(self.sign, sign)
+            self.price = np.append(self.price, np.nan)
+            self.hit = np.vstack((self.hit, hit))
+        else:
+            self.levels[i], self.sign[i], self.hit[i] = row, sign, hit
+            self.checks[i] = check
+
+    def remove(self, symbol):
+        i = self.idx.pop(symbol, None)
+        if i is None:
+            return
+        del self.symbols[i]
+        del self.checks[i]
+        self.idx = {s: j for j, s in enumerate(self.symbols)}
+        self.levels = np.delete(self.levels, i, axis=0)
+        self.sign = np.delete(self.sign, i)
+        self.price = np.delete(self.price, i)
+        self.hit = np.delete(self.hit, i, axis=0)
+
+    def mark_hit(self, symbol, level):
+        self.hit[self.idx[symbol], level] = True
+
+    def update(self, symbol, price):
+        """Set harga satu posisi; return level baru yang tercapai (lihat _levels_hit)"""
+        i = self.idx[symbol]
+        self.price[i] = price
+        # Satu baris: closure float biasa lebih murah daripada operasi array
+        level = self.checks[i](price)
+        return -1 if 0 < level < 3 and self.hit[i, level] else level
+
+    def update_all(self, prices):
+        """Set harga semua posisi (urut symbols, NaN = tidak ada ticker); return level per baris"""
+        self.price[:] = prices
+        return self._levels_hit(slice(None))
+
+    def _levels_hit(self, rows):
+        # -1 tidak ada, 0 SL, 1-3 TP tertinggi yang tercapai; TP1/TP2 yang sudah di-alert -> -1
+        # diffs > 0 = harga sudah melewati level ke arah profit (untuk LONG maupun SHORT)
+        diffs = (self.price[rows, None] - self.levels[rows]) * self.sign[rows, None]
+        tp = diffs[:, 1:] >= 0
+        level = np.where(tp.any(axis=1), 3 - np.argmax(tp[:, ::-1], axis=1), -1)
+        level = np.where(diffs[:, 0] <= 0, 0, level)
+        seen = self.hit[rows][np.arange(level.shape[0]), np.maximum(level, 0)]
+        return np.where(seen, -1, level)
+
 
 class TradingBot:
     def __init__(self, config_path='config/config.json'):
@@ -22,6 +129,8 @@ class TradingBot:
             api_key=self.config.get('api_key', ''),
             secret=self.config.get('api_secret', '')
         )
+        # Markets dimuat sekali saat start; koneksi HTTP keep-alive dipool oleh provider
+        self.data_provider.preload_markets()
         
         self.strategy = TechnicalAnalysisStrategy(
             atr_multiplier=self.config.get('atr_multiplier', 1.0),
@@ -37,10 +146,40 @@ class TradingBot:
         self.entry_positions = {}
         self.position_ids = {}
         
+        # Event loop persisten di thread background: exchange async/websocket dipakai ulang
+        # antar menu, dan monitoring jalan di loop ini selagi menu menunggu input()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._async_provider = None
+        self._pro_exchange = None
+        self._watch_tasks = {}  # symbol -> task watcher websocket (hanya disentuh dari self._loop)
+        self._poll_task = None
+        self._positions = PositionsSoA()  # level SL/TP entry_positions untuk cek vektor
+        self._pending_prices = {}  # symbol -> harga terakhir, di-flush ke DB per batch
+        self._flush_task = None
+        self._backoff = {}  # symbol (None = poll REST) -> jeda retry berikutnya setelah error
+        self._analysis_pool = ThreadPoolExecutor(max_workers=8)
+        # OHLCV dipakai ulang lintas menu (dan restart) sampai bar timeframe berikutnya
+        self._ohlcv_cache = OHLCVCache(self.config.get('ohlcv_cache_dir'))
+        # (symbol, timeframe, ts bar terakhir) -> hasil analyze; bar baru = key baru
+        self._analysis_cache = OrderedDict()
+        self._analysis_lock = threading.Lock()
+        self._warmup()
+        
+    def _warmup(self):
+        """Satu analyze() di data sintetis 100 bar saat start, supaya load kernel / TA-Lib
+        dan jalur pertama analyze tidak terasa di menu pertama"""
+        close = 100.0 + np.sin(np.linspace(0.0, 12.0, 100)) * 5.0
+        df = pd.DataFrame({
+            'open': close, 'high': close * 1.01, 'low': close * 0.99,
+            'close': close, 'volume': np.ones(100),
+        }).astype(np.float32)
+        self.strategy.analyze(df)
+        
     def load_config(self):
         try:
-            with open(self.config_path, 'r') as f:
-                self.config = json.load(f)
+            with open(self.config_path, 'rb') as f:
+                self.config = json_loads(f.read())
         except FileNotFoundError:
             self.config = {
                 'symbols': ['SOL/USDT', 'ADA/USDT', 'XRP/USDT', 'DOT/USDT', 'AVAX/USDT'],
@@ -54,28 +193,119 @@ class TradingBot:
             self.save_config()
             
     def save_config(self):
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=4)
+        write_atomic(self.config_path, json_dumps(self.config))
             
     def get_popular_coins(self, limit=20):
         return self.data_provider.get_popular_coins(limit)
+    
+    async def _get_async_provider(self):
+        if self._async_provider is None:
+            self._async_provider = AsyncCCXTDataProvider(
+                exchange_id=self.config.get('exchange', 'binance'),
+                api_key=self.config.get('api_key', ''),
+                secret=self.config.get('api_secret', '')
+            )
+        return self._async_provider
+    
+    async def _analyze_coins(self, coins, limit=100):
+        """Fetch OHLCV semua koin bersamaan (rate limit ccxt yang mengatur jarak); tiap koin
+        di-analyze di thread pool begitu datanya tiba, kernel nogil jalan paralel"""
+        provider = await self._get_async_provider()
+        loop = asyncio.get_running_loop()
+        
+        async def job(coin):
+            df = self._ohlcv_cache.get(coin, self.timeframe, limit)
+            if df is not None:
+                return await loop.run_in_executor(self._analysis_pool, self._analyze_coin, coin, df)
+            # Cache miss: analisis langsung dari list ccxt; frame hanya dibangun untuk cache
+            ohlcv = await provider.get_ohlcv_raw_async(coin, self.timeframe, limit)
+            loop.run_in_executor(self._analysis_pool, self._ohlcv_cache.put_raw, coin, self.timeframe, limit, ohlcv)
+            return await loop.run_in_executor(self._analysis_pool, self._analyze_coin_raw, coin, ohlcv)
+        
+        analyses = await asyncio.gather(*(job(coin) for coin in coins), return_exceptions=True)
+        return [a for a in analyses if a is not None and not isinstance(a, Exception)]
+    
+    def _get_ohlcv(self, symbol, limit=100):
+        df = self._ohlcv_cache.get(symbol, self.timeframe, limit)
+        if df is None:
+            df = self.data_provider.get_ohlcv(symbol, self.timeframe, limit)
+            self._ohlcv_cache.put(symbol, self.timeframe, limit, df)
+        return df
+    
+    def _analyze_cached(self, symbol, last_ts, analyze, maxsize=512):
+        """analyze() di-memo per (symbol, timeframe, ts ms bar terakhir); return salinan
+        (menu mengubah dict hasil)"""
+        key = (symbol, self.timeframe, last_ts)
+        with self._analysis_lock:
+            hit = key in self._analysis_cache
+            if hit:
+                self._analysis_cache.move_to_end(key)
+                analysis = self._analysis_cache[key]
+        if not hit:
+            analysis = analyze()
+            with self._analysis_lock:
+                self._analysis_cache[key] = analysis
+                while len(self._analysis_cache) > maxsize:
+                    self._analysis_cache.popitem(last=False)
+        return dict(analysis) if analysis else analysis
+    
+    def _analyze_df(self, symbol, df):
+        last_ts = int(df['timestamp'].values[-1].astype('datetime64[ms]').astype(np.int64))
+        return self._analyze_cached(symbol, last_ts, lambda: self.strategy.analyze(df))
+    
+    def _analyze_coin_raw(self, coin, ohlcv):
+        if not ohlcv or len(ohlcv) < 50:
+            return None
+        analysis = self._analyze_cached(coin, int(ohlcv[-1][0]), lambda: self.strategy.analyze_raw(ohlcv))
+        return self._signal(coin, analysis)
+    
+    def _analyze_coin(self, coin, df):
+        if df is None or len(df) < 50:
+            return None
+        return self._signal(coin, self._analyze_df(coin, df))
+    
+    def _signal(self, coin, analysis):
+        if analysis and analysis['action'] in ['LONG', 'SHORT']:
+            analysis['symbol'] = coin
+            return analysis
+        return None
+    
+    async def _get_pro_exchange(self):
+        if self._pro_exchange is None:
+            exchange_class = getattr(ccxtpro, self.config.get('exchange', 'binance'))
+            self._pro_exchange = exchange_class({
+                'apiKey': self.config.get('api_key', ''),
+                'secret': self.config.get('api_secret', ''),
+                # Harga di-push websocket; throttle ccxt tetap aktif untuk subscribe/reconnect dan REST
+                'enableRateLimit': True,
+            })
+        return self._pro_exchange
+    
+    def _run(self, coro):
+        """Jalankan coroutine di loop background dan tunggu hasilnya"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _aclose(self):
+        await self._flush_prices()
+        if self._async_provider is not None:
+            await self._async_provider.close()
+            self._async_provider = None
+        if self._pro_exchange is not None:
+            await self._pro_exchange.close()
+            self._pro_exchange = None
+    
+    def close(self):
+        self._run(self._aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._analysis_pool.shutdown(wait=False)
+        self.db.close()
             
     def menu_1_top_5_coins(self):
         print("Menganalisis Top 5 Koin Potensial...")
         popular_coins = self.get_popular_coins(15)
         
-        results = []
         print("Sedang menganalisis koin-koin populer...")
-        for coin in popular_coins:
-            df = self.data_provider.get_ohlcv(coin, self.timeframe, 100)
-            if df is None or len(df) < 50:
-                continue
-                
-            analysis = self.strategy.analyze(df)
-            if analysis and analysis['action'] in ['LONG', 'SHORT']:
-                analysis['symbol'] = coin
-                results.append(analysis)
-            time.sleep(0.1)
+        results = self._run(self._analyze_coins(popular_coins))
         
         results.sort(key=lambda x: x.get('score', 0), reverse=True)
         
@@ -87,13 +317,7 @@ class TradingBot:
             print("Tidak ada sinyal trading kuat yang ditemukan.")
             return
             
-        for i, result in enumerate(results[:5], 1):
-            print(f"\n{i}. {result['symbol']} - {result['action']} (Score: {result['score']}/5)")
-            print(f"   Range Entry: {result['entry_low']:.4f} - {result['entry_high']:.4f}")
-            print(f"   TP1: {result['tp1']:.4f} | TP2: {result['tp2']:.4f} | TP3: {result['tp3']:.4f}")
-            print(f"   SL: {result['sl']:.4f}")
-            print(f"   RSI: {result['rsi']:.2f} | Trend: {result['trend']}")
-            print(f"   Volume: {result['volume_ratio']:.2f}x rata-rata")
+        print("\n".join(TOP_COIN_TEMPLATE.format(i=i, **result) for i, result in enumerate(results[:5], 1)))
             
         print(f"\nPilih koin yang ingin dimonitor (contoh: 1 3 5 atau 'all' untuk semua):")
         choice = input("Pilihan: ").strip().lower()
@@ -139,20 +363,17 @@ class TradingBot:
                     except ValueError:
                         print("Masukkan angka yang valid.")
             
-            self.entry_positions = {coin['symbol']: coin for coin in selected_coins}
-            self.alert_active = True
             print(f"\n✅ Memonitor {len(selected_coins)} koin untuk alert...")
             print("🔊 Sound alert AKTIF!")
             self.notifier.play_alert()
             
-            for symbol, position in self.entry_positions.items():
-                position_id = self.db.save_position(position)
-                self.position_ids[symbol] = position_id
-                print(f"Posisi {symbol} disimpan dengan ID: {position_id}")
+            for coin in selected_coins:
+                position_id = self.db.save_position(coin)
+                self.position_ids[coin['symbol']] = position_id
+                print(f"Posisi {coin['symbol']} disimpan dengan ID: {position_id}")
                 
-            alert_thread = threading.Thread(target=self.start_monitoring)
-            alert_thread.daemon = True
-            alert_thread.start()
+            # Pilihan menu 1 menggantikan daftar posisi yang dimonitor
+            self.add_positions({coin['symbol']: coin for coin in selected_coins}, replace=True)
     
     def menu_2_analyze_coin(self):
         symbol = input("Masukkan simbol koin (contoh: SOL/USDT): ").strip().upper()
@@ -160,12 +381,12 @@ class TradingBot:
             symbol += '/USDT'
             
         print(f"Menganalisis {symbol}...")
-        df = self.data_provider.get_ohlcv(symbol, self.timeframe, 100)
+        df = self._get_ohlcv(symbol, 100)
         if df is None or len(df) < 50:
             print(f"Tidak dapat mendapatkan data untuk {symbol} atau data tidak cukup")
             return
             
-        analysis = self.strategy.analyze(df)
+        analysis = self._analyze_df(symbol, df)
         if analysis:
             analysis['symbol'] = symbol
             print(f"\n=== HASIL ANALISIS {symbol} ===")
@@ -209,9 +430,6 @@ class TradingBot:
                     except ValueError:
                         print("Masukkan angka yang valid.")
                 
-                self.entry_positions[symbol] = analysis
-                self.alert_active = True
-                
                 position_id = self.db.save_position(analysis)
                 self.position_ids[symbol] = position_id
                 print(f"Posisi {symbol} disimpan dengan ID: {position_id}")
@@ -219,9 +437,7 @@ class TradingBot:
                 print("✅ Alert aktif! Bot akan memantau pergerakan harga.")
                 print("🔊 Sound alert AKTIF!")
                 self.notifier.play_alert()
-                alert_thread = threading.Thread(target=self.start_monitoring)
-                alert_thread.daemon = True
-                alert_thread.start()
+                self.add_positions({symbol: analysis})
         else:
             print(f"Tidak dapat menganalisis {symbol} atau tidak ada sinyal trading")
             
@@ -238,13 +454,14 @@ class TradingBot:
                 print("Arah trading harus LONG atau SHORT")
                 return
                 
-            df = self.data_provider.get_ohlcv(symbol, self.timeframe, 100)
+            df = self._get_ohlcv(symbol, 100)
             if df is None or len(df) < 50:
                 print("Gagal mendapatkan data market atau data tidak cukup")
                 return
                 
-            import talib
-            atr = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14).iloc[-1]
+            # Kolom diambil sekali sebagai array float64; kernel njit hanya hitung ATR terakhir
+            _, high, low, close, _ = _ohlcv_arrays(df)
+            atr = atr_last(high, low, close, ATR_PERIOD)
             
             if direction == "LONG":
                 tp1 = entry_price + atr * self.strategy.atr_multiplier
@@ -273,7 +490,7 @@ class TradingBot:
                 'tp2': tp2,
                 'tp3': tp3,
                 'sl': sl,
-                'current_price': df['close'].iloc[-1] if df is not None else entry_price,
+                'current_price': float(close[-1]),
                 'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
@@ -283,14 +500,10 @@ class TradingBot:
             
             monitor = input("\nIngin monitor posisi ini untuk alert? (y/n): ").lower()
             if monitor == 'y':
-                self.entry_positions[symbol] = position_data
-                self.alert_active = True
                 print("Alert aktif! Bot akan memantau pergerakan harga.")
                 print("🔊 Sound alert AKTIF!")
                 self.notifier.play_alert()
-                alert_thread = threading.Thread(target=self.start_monitoring)
-                alert_thread.daemon = True
-                alert_thread.start()
+                self.add_positions({symbol: position_data})
                 
         except ValueError:
             print("Input harga tidak valid")
@@ -302,17 +515,21 @@ class TradingBot:
             print("Tidak ada posisi yang aktif.")
             return
             
-        print("\n=== POSISI AKTIF ===")
-        for symbol, position in self.entry_positions.items():
+        # Susun semua baris dulu, lalu satu write ke stdout
+        out = ["\n=== POSISI AKTIF ==="]
+        for symbol, position in list(self.entry_positions.items()):
             position_id = self.position_ids.get(symbol, 'N/A')
-            print(f"\n{symbol} (ID: {position_id}) - {position['action']}")
-            print(f"Entry: {position['entry']}")
-            print(f"TP1: {position['tp1']} {'✅' if position.get('tp1_hit') else ''}")
-            print(f"TP2: {position['tp2']} {'✅' if position.get('tp2_hit') else ''}")
-            print(f"TP3: {position['tp3']} {'✅' if position.get('tp3_hit') else ''}")
-            print(f"SL: {position['sl']}")
-            print(f"Harga Sekarang: {position.get('current_price', 'N/A')}")
-            print(f"Waktu Entry: {position.get('timestamp', 'N/A')}")
+            out.append(
+                f"\n{symbol} (ID: {position_id}) - {position['action']}\n"
+                f"Entry: {position['entry']}\n"
+                f"TP1: {position['tp1']} {'✅' if position.get('tp1_hit') else ''}\n"
+                f"TP2: {position['tp2']} {'✅' if position.get('tp2_hit') else ''}\n"
+                f"TP3: {position['tp3']} {'✅' if position.get('tp3_hit') else ''}\n"
+                f"SL: {position['sl']}\n"
+                f"Harga Sekarang: {position.get('current_price', 'N/A')}\n"
+                f"Waktu Entry: {position.get('timestamp', 'N/A')}"
+            )
+        sys.stdout.write("\n".join(out) + "\n")
             
     def menu_5_show_history(self):
         print("\n=== HISTORY TRADING ===")
@@ -328,107 +545,153 @@ class TradingBot:
             print(f"P/L: {trade[5]:.4f} | Type: {trade[6]}")
             print(f"Time: {trade[7]}")
             
-    def start_monitoring(self):
-        print("📡 Memulai live alerts dengan sound...")
-        print("🔊 Sound alert AKTIF!")
-        print("⏹️  Tekan Ctrl+C di menu utama untuk menghentikan")
+    def add_positions(self, positions, replace=False):
+        """Daftarkan posisi ke monitor; state posisi hanya diubah di thread event loop"""
+        self._run(self._add_positions(positions, replace))
+    
+    async def _add_positions(self, positions, replace):
+        if replace:
+            self.entry_positions = dict(positions)
+            self._positions = PositionsSoA()
+        else:
+            self.entry_positions.update(positions)
+        for symbol, position in positions.items():
+            self._positions.add(symbol, position)
+        self.alert_active = True
+        await self.start_monitoring()
+    
+    async def start_monitoring(self):
+        """Pasang task monitor untuk posisi yang belum dipantau (aman dipanggil berulang)"""
+        if not self._watch_tasks and (self._poll_task is None or self._poll_task.done()):
+            print("📡 Memulai live alerts dengan sound...")
+            print("🔊 Sound alert AKTIF!")
+            print("⏹️  Tekan Ctrl+C di menu utama untuk menghentikan")
         
         try:
-            while self.alert_active and self.entry_positions:
-                for symbol, position in list(self.entry_positions.items()):
-                    try:
-                        ticker = self.data_provider.get_ticker(symbol)
-                        if not ticker:
-                            continue
-                            
-                        current_price = ticker['last']
-                        
-                        self.entry_positions[symbol]['current_price'] = current_price
-                        
-                        position_id = self.position_ids.get(symbol)
-                        if position_id:
-                            self.db.update_position(position_id, {'current_price': current_price})
-                        
-                        if position['action'] == 'LONG':
-                            if current_price <= position['sl']:
-                                print(f"\n🚨 SELL NOW! {symbol} hit Stop Loss at {current_price}")
-                                print(f"Entry: {position['entry']} | SL: {position['sl']}")
-                                self.notifier.play_alert("loss")
-                                
-                                if symbol in self.position_ids:
-                                    self.db.close_position(self.position_ids[symbol], current_price, "SL")
-                                    del self.position_ids[symbol]
-                                
-                                del self.entry_positions[symbol]
-                            elif current_price >= position['tp3']:
-                                print(f"\n🎯 TP3 HIT! {symbol} at {current_price}")
-                                print(f"Entry: {position['entry']} | TP3: {position['tp3']}")
-                                self.notifier.play_alert("profit")
-                                
-                                if symbol in self.position_ids:
-                                    self.db.close_position(self.position_ids[symbol], current_price, "TP3")
-                                    del self.position_ids[symbol]
-                                
-                                del self.entry_positions[symbol]
-                            elif current_price >= position['tp2']:
-                                if 'tp2_hit' not in position:
-                                    print(f"\n🎯 TP2 HIT! {symbol} at {current_price}")
-                                    print(f"Entry: {position['entry']} | TP2: {position['tp2']}")
-                                    self.notifier.play_alert("profit")
-                                    self.entry_positions[symbol]['tp2_hit'] = True
-                            elif current_price >= position['tp1']:
-                                if 'tp1_hit' not in position:
-                                    print(f"\n🎯 TP1 HIT! {symbol} at {current_price}")
-                                    print(f"Entry: {position['entry']} | TP1: {position['tp1']}")
-                                    self.notifier.play_alert("profit")
-                                    self.entry_positions[symbol]['tp1_hit'] = True
-                                    
-                        elif position['action'] == 'SHORT':
-                            if current_price >= position['sl']:
-                                print(f"\n🚨 SELL NOW! {symbol} hit Stop Loss at {current_price}")
-                                print(f"Entry: {position['entry']} | SL: {position['sl']}")
-                                self.notifier.play_alert("loss")
-                                
-                                if symbol in self.position_ids:
-                                    self.db.close_position(self.position_ids[symbol], current_price, "SL")
-                                    del self.position_ids[symbol]
-                                
-                                del self.entry_positions[symbol]
-                            elif current_price <= position['tp3']:
-                                print(f"\n🎯 TP3 HIT! {symbol} at {current_price}")
-                                print(f"Entry: {position['entry']} | TP3: {position['tp3']}")
-                                self.notifier.play_alert("profit")
-                                
-                                if symbol in self.position_ids:
-                                    self.db.close_position(self.position_ids[symbol], current_price, "TP3")
-                                    del self.position_ids[symbol]
-                                
-                                del self.entry_positions[symbol]
-                            elif current_price <= position['tp2']:
-                                if 'tp2_hit' not in position:
-                                    print(f"\n🎯 TP2 HIT! {symbol} at {current_price}")
-                                    print(f"Entry: {position['entry']} | TP2: {position['tp2']}")
-                                    self.notifier.play_alert("profit")
-                                    self.entry_positions[symbol]['tp2_hit'] = True
-                            elif current_price <= position['tp1']:
-                                if 'tp1_hit' not in position:
-                                    print(f"\n🎯 TP1 HIT! {symbol} at {current_price}")
-                                    print(f"Entry: {position['entry']} | TP1: {position['tp1']}")
-                                    self.notifier.play_alert("profit")
-                                    self.entry_positions[symbol]['tp1_hit'] = True
-                                
-                    except Exception as e:
-                        print(f"Error monitoring {symbol}: {e}")
-                        
-                if not self.entry_positions:
-                    print("\n✅ Semua posisi telah ditutup.")
-                    self.alert_active = False
-                    break
-                    
-                time.sleep(10)
-                
+            exchange = await self._get_pro_exchange()
+            if self.config.get('use_websocket', True) and exchange.has.get('watchTicker'):
+                # Satu task watcher websocket per simbol; simbol yang sudah dipantau tidak diduplikasi
+                for symbol in self.entry_positions:
+                    task = self._watch_tasks.get(symbol)
+                    if task is None or task.done():
+                        self._watch_tasks[symbol] = asyncio.create_task(self._watch_symbol(symbol))
+            elif self._poll_task is None or self._poll_task.done():
+                self._poll_task = asyncio.create_task(self._poll_positions())
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(
+                    self._flush_prices_loop(self.config.get('price_flush_interval', 60)))
         except Exception as e:
             print(f"Error in monitoring: {e}")
+    
+    async def _watch_symbol(self, symbol):
+        try:
+            exchange = await self._get_pro_exchange()
+            while self.alert_active and symbol in self.entry_positions:
+                try:
+                    ticker = await exchange.watch_ticker(symbol)
+                    self._backoff.pop(symbol, None)
+                    if ticker and ticker.get('last') is not None and symbol in self.entry_positions:
+                        self._check_position(symbol, ticker['last'])
+                except Exception as e:
+                    print(f"Error monitoring {symbol}: {e}")
+                    await asyncio.sleep(self._next_backoff(symbol))
+        finally:
+            if self._watch_tasks.get(symbol) is asyncio.current_task():
+                del self._watch_tasks[symbol]
+    
+    async def _poll_positions(self, interval=10):
+        """Fallback REST: satu fetch_tickers untuk semua posisi per siklus, cek SL/TP sekali jalan"""
+        while self.alert_active and self.entry_positions:
+            tickers = await asyncio.to_thread(
+                self.data_provider.get_tickers, list(self._positions.symbols)
+            )
+            if not tickers:
+                # get_tickers gagal (429 / jaringan): jeda naik eksponensial, bukan retry tiap interval
+                await asyncio.sleep(self._next_backoff(None, interval))
+                continue
+            self._backoff.pop(None, None)
+            # Tabel bisa berubah selama await (_add_positions): susun vektor harga dari
+            # symbols tabel yang sekarang, bukan dari salinan sebelum fetch
+            positions = self._positions
+            symbols = list(positions.symbols)
+            prices = np.fromiter(
+                ((tickers.get(s) or {}).get('last') or np.nan for s in symbols),
+                dtype=np.float64, count=len(symbols),
+            )
+            levels = positions.update_all(prices)
+            for i in np.flatnonzero(~np.isnan(prices)):
+                self._set_price(symbols[i], float(prices[i]))
+            for i in np.flatnonzero(levels >= 0):
+                try:
+                    self._on_level(symbols[i], float(prices[i]), levels[i])
+                except Exception as e:
+                    print(f"Error monitoring {symbols[i]}: {e}")
+            await asyncio.sleep(interval)
+    
+    def _next_backoff(self, key, base=1.0):
+        """Jeda sebelum retry `key`: base, 2x, 4x, ... sampai MAX_BACKOFF; reset saat sukses"""
+        delay = self._backoff.get(key, base)
+        self._backoff[key] = min(delay * 2, MAX_BACKOFF)
+        return delay
+    
+    def _set_price(self, symbol, current_price):
+        self.entry_positions[symbol]['current_price'] = current_price
+        if self.position_ids.get(symbol):
+            # Ditulis ke DB per batch oleh _flush_prices; close (SL/TP3) tetap langsung
+            self._pending_prices[symbol] = current_price
+    
+    async def _flush_prices(self):
+        if not self._pending_prices:
+            return
+        prices, self._pending_prices = self._pending_prices, {}
+        await asyncio.to_thread(self.db.update_position_prices, prices)
+    
+    async def _flush_prices_loop(self, interval):
+        """Satu UPDATE executemany per `interval` detik, bukan satu query per tick per posisi"""
+        try:
+            while self.alert_active:
+                await asyncio.sleep(interval)
+                await self._flush_prices()
+        finally:
+            await self._flush_prices()
+    
+    def _check_position(self, symbol, current_price):
+        """Update harga posisi lalu cek SL/TP"""
+        self._set_price(symbol, current_price)
+        self._on_level(symbol, current_price, self._positions.update(symbol, current_price))
+    
+    def _on_level(self, symbol, current_price, level):
+        """Alert untuk level dari PositionsSoA: -1 tidak ada, 0 SL, 1-3 TP"""
+        if level < 0:
+            return
+        position = self.entry_positions[symbol]
+        if level == 0:
+            print(f"\n🚨 SELL NOW! {symbol} hit Stop Loss at {current_price}")
+            print(f"Entry: {position['entry']} | SL: {position['sl']}")
+            self.notifier.play_alert("loss")
+            self._close_position(symbol, current_price, "SL")
+            return
+        
+        kind = LEVEL_KINDS[level]
+        print(f"\n🎯 {kind} HIT! {symbol} at {current_price}")
+        print(f"Entry: {position['entry']} | {kind}: {position[kind.lower()]}")
+        self.notifier.play_alert("profit")
+        if level == 3:
+            self._close_position(symbol, current_price, kind)
+        else:
+            position[f"{kind.lower()}_hit"] = True
+            self._positions.mark_hit(symbol, level)
+    
+    def _close_position(self, symbol, current_price, exit_type):
+        if symbol in self.position_ids:
+            self.db.close_position(self.position_ids[symbol], current_price, exit_type)
+            del self.position_ids[symbol]
+        
+        del self.entry_positions[symbol]
+        self._positions.remove(symbol)
+        if not self.entry_positions:
+            print("\n✅ Semua posisi telah ditutup.")
+            self.alert_active = False
 
     def run(self):
         while True:
@@ -457,6 +720,7 @@ class TradingBot:
             elif choice == '6':
                 print("Terima kasih telah menggunakan bot trading!")
                 self.alert_active = False
+                self.close()
                 break
             else:
                 print("Pilihan tidak valid.")
@@ -4,7 +4,7 @@ import os
 
 PyInstaller.__main__.run([
     'main.py',
-    '--onefile',
+    '--onedir',  # folder sudah terekstrak: tanpa untar ke temp dir di setiap start
     '--name=TradingBot',
     '--add-data=.env;.',
     '--add-data=config;config',
@@ -14,5 +14,9 @@ PyInstaller.__main__.run([
     '--hidden-import=pandas',
     '--hidden-import=numpy',
     '--hidden-import=talib',
+    '--exclude-module=tkinter',
+    '--exclude-module=matplotlib',
+    '--exclude-module=PyQt5',
+    '--noupx',  # binary tidak perlu di-decompress saat load
     '--clean'
 ])
\ No newline at end of file
@@ -1,240 +1,576 @@
+import io
 import os
-import psycopg2
+import re
+import csv
 import threading
+import logging
+import operator
+import numpy as np
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from collections import namedtuple
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from datetime import datetime
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# Urutan kolom hasil get_active_positions / get_trade_history (SELECT eksplisit, bukan *)
+POSITION_COLUMNS = [
+    "id", "symbol", "market_type", "action", "entry_price",
+    "entry_low", "entry_high", "tp1", "tp2", "tp3", "sl",
+    "current_price", "status", "created_at", "closed_at",
+]
+HISTORY_COLUMNS = [
+    "id", "symbol", "market_type", "action", "entry_price",
+    "exit_price", "profit_loss", "type", "timestamp",
+]
+# Row get_active_positions: akses per nama (row.symbol), tetap tuple dan bisa di-pickle (st.cache_data)
+PositionRow = namedtuple("PositionRow", POSITION_COLUMNS)
+POSITION_SELECT = ", ".join(POSITION_COLUMNS)
+HISTORY_SELECT = ", ".join(HISTORY_COLUMNS)
+
+# Kolom INSERT signals, urutan = tuple parameter; default untuk key yang tidak ada di payload
+SIGNAL_COLUMNS = (
+    "symbol", "market_type", "action", "entry_low", "entry_high",
+    "tp1", "tp2", "tp3", "sl", "current_price",
+    "rsi", "trend", "volume_ratio", "atr", "score",
+    "swing_flags", "ema_trend", "ema_score",
+)
+# HH/HL/LH/LL disimpan sebagai bitmap swing_flags: bit i = SWING_KEYS[i]
+SWING_KEYS = ("hh", "hl", "lh", "ll")
+SIGNAL_DEFAULTS = {
+    **dict.fromkeys(SIGNAL_COLUMNS[3:]),
+    **dict.fromkeys(SWING_KEYS, False),
+    "ema_trend": "NEUTRAL",
+    "ema_score": 0,
+}
+_signal_fields = operator.itemgetter(*SIGNAL_COLUMNS)
+
+# Multi-row INSERT untuk execute_values: satu statement (parse/plan/execute) per page
+SIGNAL_INSERT_SQL = f"INSERT INTO signals ({', '.join(SIGNAL_COLUMNS)}) VALUES %s"
+SIGNAL_PAGE_SIZE = 500
+POSITION_INSERT_SQL = """
+    INSERT INTO positions (
+        symbol, market_type, action, entry_price,
+        entry_low, entry_high, tp1, tp2, tp3, sl, current_price
+    )
+    VALUES %s
+    RETURNING id
+"""
+POSITION_PAGE_SIZE = 128
+
+
+def _values(n):
+    return "(" + ", ".join(["%s"] * n) + ")"
+
+
+# Statement single-row yang jalan tiap tick: PREPARE sekali per koneksi, lalu EXECUTE
+# (tanpa parse/plan ulang). name -> (tipe parameter, SQL dengan placeholder %s)
+PREPARED_STATEMENTS = {
+    "insert_signal_v1": (
+        "TEXT, TEXT, TEXT, REAL, REAL, REAL, REAL, REAL, REAL, REAL, "
+        "REAL, TEXT, REAL, REAL, SMALLINT, SMALLINT, TEXT, SMALLINT",
+        SIGNAL_INSERT_SQL % _values(len(SIGNAL_COLUMNS)) + " RETURNING id",
+    ),
+    "insert_position_v1": (
+        "TEXT, TEXT, TEXT, REAL, REAL, REAL, REAL, REAL, REAL, REAL, REAL",
+        POSITION_INSERT_SQL % _values(11),
+    ),
+    "update_position_price_v1": (
+        "REAL, TEXT",
+        "UPDATE positions SET current_price = %s WHERE symbol = %s AND status = 'active'",
+    ),
+    # Tutup posisi + catat history dalam satu statement (satu round trip, satu snapshot)
+    "close_position_v2": (
+        "REAL, INT, REAL, REAL, REAL, TEXT",
+        """
+        WITH closed AS (
+            UPDATE positions
+            SET status = 'closed', closed_at = CURRENT_TIMESTAMP, current_price = %s
+            WHERE id = %s
+            RETURNING symbol, market_type, action, entry_price
+        )
+        INSERT INTO trade_history (
+            symbol, market_type, action,
+            entry_price, exit_price, profit_loss, type
+        )
+        SELECT symbol, market_type, action, entry_price, %s,
+               CASE WHEN action = 'LONG' THEN %s - entry_price ELSE entry_price - %s END, %s
+        FROM closed
+        RETURNING profit_loss
+        """,
+    ),
+}
+
+
+def _to_py(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def decode_swing_flags(flags):
+    """swing_flags bitmap -> {"hh": bool, "hl": bool, "lh": bool, "ll": bool}"""
+    return {key: bool(flags >> bit & 1) for bit, key in enumerate(SWING_KEYS)}
+
+
+def _copy_cell(value):
+    # Format CSV COPY: boolean t/f, NULL = field kosong tanpa quote
+    if value is None:
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return "t" if value else "f"
+    return value
+
+
+def _numbered(sql):
+    """%s placeholders -> $1, $2, ... for PREPARE"""
+    counter = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+
 
 class DatabaseHandler:
+    _schema_ready = False  # create_tables sekali per proses, bukan per instance
+
     def __init__(self):
         self.db_type = os.getenv("DB_TYPE", "postgresql")
-        self.thread_local = threading.local()
+        # Konfigurasi koneksi dibaca sekali dari env
+        self._conn_kwargs = dict(
+            dbname=os.getenv("DB_NAME", "postgres"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASSWORD", ""),
+            host=os.getenv("DB_HOST", "localhost"),
+            port=os.getenv("DB_PORT", "5432"),
+        )
+        self._pool_max = int(os.getenv("DB_POOL_MAX", "16"))
+        self.pool = self._create_pool()
+        self._prepared = {}  # id(conn) -> conn yang sudah PREPARE semua PREPARED_STATEMENTS
+        self._prepare_tried = {}  # id(conn) -> conn yang sudah dicoba PREPARE (berhasil atau tidak)
+        self._local = threading.local()  # koneksi transaction() yang aktif di thread ini
         self.create_tables()
 
     # =========================================================
     # Connection
     # =========================================================
-    def get_connection(self):
-        """Get or create a thread-local database connection"""
-        if not hasattr(self.thread_local, "conn"):
+    def _create_pool(self):
+        """Create the shared connection pool (one handshake per connection, bounded backends)"""
+        try:
+            pool = ThreadedConnectionPool(minconn=2, maxconn=self._pool_max, **self._conn_kwargs)
+            log.debug("Connected to database successfully")
+            return pool
+        except Exception as e:
+            print(f"Failed to connect to database: {e}")
+            raise
+
+    @contextmanager
+    def _checkout(self):
+        """Borrow a pooled connection; roll back a failed transaction before returning it"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # Di dalam transaction(): pakai koneksinya, commit/putconn diurus transaction()
+            yield conn
+            return
+        conn = self.pool.getconn()
+        if DatabaseHandler._schema_ready and self._prepare_tried.get(id(conn)) is not conn:
+            self._prepare(conn)
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Group several writer calls of this thread into one transaction, committed once on exit.
+
+        Writers called outside a transaction still commit per call. A writer error
+        inside one marks it failed and the whole transaction is rolled back on exit.
+        """
+        if getattr(self._local, "conn", None) is not None:
+            yield self._local.conn  # nested: transaksi terluar yang commit
+            return
+        with self._checkout() as conn:
+            self._local.conn = conn
+            self._local.failed = False
             try:
-                print(f"Connecting to database: {os.getenv('DB_HOST')}")
-                self.thread_local.conn = psycopg2.connect(
-                    dbname=os.getenv("DB_NAME", "postgres"),
-                    user=os.getenv("DB_USER", "postgres"),
-                    password=os.getenv("DB_PASSWORD", ""),
-                    host=os.getenv("DB_HOST", "localhost"),
-                    port=os.getenv("DB_PORT", "5432"),
-                )
-                print("Connected to database successfully")
+                yield conn
+            finally:
+                self._local.conn = None
+            if self._local.failed:
+                conn.rollback()
+            else:
+                conn.commit()
+
+    def _commit(self, conn):
+        """Commit, unless the call runs inside transaction()"""
+        if getattr(self._local, "conn", None) is not conn:
+            conn.commit()
+
+    def _rollback(self, conn):
+        """Roll back, or mark the surrounding transaction() as failed"""
+        if getattr(self._local, "conn", None) is conn:
+            self._local.failed = True
+        else:
+            conn.rollback()
+
+    def _prepare(self, conn):
+        """PREPARE the hot statements once on a fresh pooled connection (one attempt per connection)"""
+        self._prepare_tried[id(conn)] = conn
+        try:
+            with conn.cursor() as cursor:
+                for name, (types, sql) in PREPARED_STATEMENTS.items():
+                    cursor.execute(f"PREPARE {name} ({types}) AS {_numbered(sql)}")
+            conn.commit()
+            self._prepared[id(conn)] = conn
+        except Exception as e:
+            # Tetap jalan dengan SQL biasa (lihat _execute)
+            print(f"Error preparing statements: {e}")
+            conn.rollback()
+            # PREPARE tidak ikut di-rollback: buang yang sempat dibuat agar sesi bersih
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("DEALLOCATE ALL")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+
+    def _execute(self, conn, cursor, name, params):
+        """EXECUTE a prepared statement, or its plain SQL if this connection has none"""
+        if self._prepared.get(id(conn)) is conn:
+            cursor.execute(f"EXECUTE {name} {_values(len(params))}", params)
+        else:
+            cursor.execute(PREPARED_STATEMENTS[name][1], params)
+
+    def bulk_execute(self, sql, rows, page_size=100):
+        """Run one parameterized statement for many rows, `page_size` statements per round trip.
+
+        UPDATE/DELETE companion of execute_values (which only fits multi-row INSERT/VALUES).
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                execute_batch(cursor, sql, rows, page_size=page_size)
+                self._commit(conn)
+                return len(rows)
             except Exception as e:
-                print(f"Failed to connect to database: {e}")
-                raise
-        return self.thread_local.conn
+                print(f"Error executing batch: {e}")
+                self._rollback(conn)
+                return 0
+
+    def close(self):
+        """Close every pooled connection"""
+        self.pool.closeall()
+        self._prepared.clear()
+        self._prepare_tried.clear()
 
     # =========================================================
     # Schema
     # =========================================================
     def create_tables(self):
-        """Create tables with the correct schema"""
-        conn, cursor = None, None
+        """Create missing tables (existing data is kept)"""
+        if DatabaseHandler._schema_ready:
+            return
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self._checkout() as conn, conn.cursor() as cursor:
+                # Table: signals
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS signals (
+                        id SERIAL PRIMARY KEY,
+                        symbol TEXT NOT NULL,
+                        market_type TEXT NOT NULL,
+                        action TEXT NOT NULL,
+                        entry_low REAL,
+                        entry_high REAL,
+                        tp1 REAL,
+                        tp2 REAL,
+                        tp3 REAL,
+                        sl REAL,
+                        current_price REAL,
+                        rsi REAL,
+                        trend TEXT,
+                        volume_ratio REAL,
+                        atr REAL,
+                        score SMALLINT,
+                        swing_flags SMALLINT NOT NULL DEFAULT 0,
+                        ema_trend TEXT,
+                        ema_score SMALLINT,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                )
+                self._migrate_signals(cursor)
 
-            # Drop tables (reset)
-            cursor.execute("DROP TABLE IF EXISTS signals CASCADE")
-            cursor.execute("DROP TABLE IF EXISTS positions CASCADE")
-            cursor.execute("DROP TABLE IF EXISTS trade_history CASCADE")
+                # Table: positions
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS positions (
+                        id SERIAL PRIMARY KEY,
+                        symbol TEXT NOT NULL,
+                        market_type TEXT NOT NULL,
+                        action TEXT NOT NULL,
+                        entry_price REAL,
+                        entry_low REAL,
+                        entry_high REAL,
+                        tp1 REAL,
+                        tp2 REAL,
+                        tp3 REAL,
+                        sl REAL,
+                        current_price REAL,
+                        status TEXT DEFAULT 'active',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        closed_at TIMESTAMP
+                    )
+                    """
+                )
 
-            # Table: signals
-            cursor.execute(
-                """
-                CREATE TABLE signals (
-                    id SERIAL PRIMARY KEY,
-                    symbol TEXT NOT NULL,
-                    market_type TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    entry_low REAL,
-                    entry_high REAL,
-                    tp1 REAL,
-                    tp2 REAL,
-                    tp3 REAL,
-                    sl REAL,
-                    current_price REAL,
-                    rsi REAL,
-                    trend TEXT,
-                    volume_ratio REAL,
-                    atr REAL,
-                    score INTEGER,
-                    hh BOOLEAN,
-                    hl BOOLEAN,
-                    lh BOOLEAN,
-                    ll BOOLEAN,
-                    ema_trend TEXT,
-                    ema_score INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                # Table: trade_history
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS trade_history (
+                        id SERIAL PRIMARY KEY,
+                        symbol TEXT NOT NULL,
+                        market_type TEXT NOT NULL,
+                        action TEXT NOT NULL,
+                        entry_price REAL,
+                        exit_price REAL,
+                        profit_loss REAL,
+                        type TEXT,
+                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
                 )
-                """
-            )
 
-            # Table: positions
+                # Index sesuai filter + urutan query yang sering jalan:
+                # history "ORDER BY timestamp DESC LIMIT n" (semua / per market),
+                # sinyal per market terbaru dulu dan delete per simbol,
+                # posisi aktif per market dan update harga per simbol aktif
+                for index_sql in (
+                    "idx_trade_history_ts ON trade_history (timestamp DESC)",
+                    "idx_trade_history_mt_ts ON trade_history (market_type, timestamp DESC)",
+                    "idx_signals_mt_ts ON signals (market_type, timestamp DESC)",
+                    "idx_signals_symbol_mt ON signals (symbol, market_type)",
+                    "idx_positions_status_mt_created ON positions (status, market_type, created_at DESC)",
+                    "idx_positions_symbol_status ON positions (symbol, status)",
+                ):
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_sql}")
+
+                conn.commit()
+                DatabaseHandler._schema_ready = True
+                log.debug("Tables created successfully")
+        except Exception as e:
+            print(f"Error creating tables: {e}")
+
+    def _migrate_signals(self, cursor):
+        """Upgrade a signals table from before swing_flags / SMALLINT scores, in place (one time)"""
+        cursor.execute(
+            """
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'signals'
+            """
+        )
+        columns = dict(cursor.fetchall())
+        cursor.execute(
+            "ALTER TABLE signals ADD COLUMN IF NOT EXISTS swing_flags SMALLINT NOT NULL DEFAULT 0"
+        )
+        if all(key in columns for key in SWING_KEYS):
+            # Bit i = SWING_KEYS[i]; operator | dan << di Postgres setara, jadi semua dikurung
             cursor.execute(
                 """
-                CREATE TABLE positions (
-                    id SERIAL PRIMARY KEY,
-                    symbol TEXT NOT NULL,
-                    market_type TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    entry_price REAL,
-                    entry_low REAL,
-                    entry_high REAL,
-                    tp1 REAL,
-                    tp2 REAL,
-                    tp3 REAL,
-                    sl REAL,
-                    current_price REAL,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    closed_at TIMESTAMP
-                )
+                UPDATE signals SET swing_flags =
+                    COALESCE(hh, FALSE)::INT
+                    | (COALESCE(hl, FALSE)::INT << 1)
+                    | (COALESCE(lh, FALSE)::INT << 2)
+                    | (COALESCE(ll, FALSE)::INT << 3)
+                WHERE swing_flags = 0 AND (hh OR hl OR lh OR ll)
                 """
             )
-
-            # Table: trade_history
             cursor.execute(
-                """
-                CREATE TABLE trade_history (
-                    id SERIAL PRIMARY KEY,
-                    symbol TEXT NOT NULL,
-                    market_type TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    entry_price REAL,
-                    exit_price REAL,
-                    profit_loss REAL,
-                    type TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
+                "ALTER TABLE signals DROP COLUMN hh, DROP COLUMN hl, DROP COLUMN lh, DROP COLUMN ll"
             )
-
+        for column in ("score", "ema_score"):
+            if columns.get(column) == "integer":
+                cursor.execute(f"ALTER TABLE signals ALTER COLUMN {column} TYPE SMALLINT")
+
+    def reset_schema(self):
+        """Drop and recreate all tables (development only: deletes every row)"""
+        with self._checkout() as conn, conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS signals, positions, trade_history CASCADE")
             conn.commit()
-            print("Tables created successfully")
-
-        except Exception as e:
-            print(f"Error creating tables: {e}")
-            if conn:
-                conn.rollback()
-        finally:
-            if cursor:
-                cursor.close()
+        DatabaseHandler._schema_ready = False
+        self.create_tables()
 
     # =========================================================
     # Signals
     # =========================================================
+    def _signal_row(self, data):
+        """Build the INSERT parameter tuple for one signal (HH/HL/LH/LL packed into swing_flags)"""
+        row = {**SIGNAL_DEFAULTS, **self._convert_numpy_types(data)}
+        row["swing_flags"] = (
+            bool(row["hh"]) | bool(row["hl"]) << 1 | bool(row["lh"]) << 2 | bool(row["ll"]) << 3
+        )
+        return _signal_fields(row)
+
     def save_signal(self, data):
         """Save signal to database with boolean casting"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        converted_data = self._convert_numpy_types(data)
-        print(f"Saving signal: {converted_data}")
-
-        try:
-            hh = bool(converted_data.get("hh", False))
-            hl = bool(converted_data.get("hl", False))
-            lh = bool(converted_data.get("lh", False))
-            ll = bool(converted_data.get("ll", False))
+        log.debug("Saving signal: %s %s", data["symbol"], data["action"])
+        signal_id = self.save_signals([data])[0]
+        log.debug("Signal saved with ID: %s", signal_id)
+        return signal_id
+
+    def save_signals(self, signals):
+        """Insert many signals with multi-row INSERT ... RETURNING id; return the ids in order"""
+        rows = [self._signal_row(s) for s in signals]
+        if not rows:
+            return []
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                if len(rows) == 1:
+                    self._execute(conn, cursor, "insert_signal_v1", rows[0])
+                    ids = cursor.fetchall()
+                else:
+                    ids = execute_values(
+                        cursor, SIGNAL_INSERT_SQL + " RETURNING id", rows,
+                        page_size=SIGNAL_PAGE_SIZE, fetch=True,
+                    )
+                self._commit(conn)
+                return [row[0] for row in ids]
+            except Exception as e:
+                print(f"Error saving signals: {e}")
+                self._rollback(conn)
+                raise
 
-            cursor.execute(
-                """
-                INSERT INTO signals (
-                    symbol, market_type, action, entry_low, entry_high,
-                    tp1, tp2, tp3, sl, current_price,
-                    rsi, trend, volume_ratio, atr, score,
-                    hh, hl, lh, ll, ema_trend, ema_score
-                )
-                VALUES (
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s
+    def save_signals_bulk(self, signals):
+        """Save many signals in one transaction (one commit for the whole scan)"""
+        if not signals:
+            return 0
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                # Sinyal bisa dibuat ulang dari scan berikutnya; tidak perlu menunggu flush WAL.
+                # Di dalam transaction() SET LOCAL akan berlaku untuk semua write lain -> lewati
+                if getattr(self._local, "conn", None) is not conn:
+                    cursor.execute("SET LOCAL synchronous_commit TO OFF")
+                execute_values(
+                    cursor, SIGNAL_INSERT_SQL, [self._signal_row(s) for s in signals],
+                    page_size=SIGNAL_PAGE_SIZE,
                 )
-                RETURNING id
-                """,
-                (
-                    converted_data["symbol"],
-                    data["market_type"],
-                    converted_data["action"],
-                    converted_data.get("entry_low"),
-                    converted_data.get("entry_high"),
-                    converted_data.get("tp1"),
-                    converted_data.get("tp2"),
-                    converted_data.get("tp3"),
-                    converted_data.get("sl"),
-                    converted_data.get("current_price"),
-                    converted_data.get("rsi"),
-                    converted_data.get("trend"),
-                    converted_data.get("volume_ratio"),
-                    converted_data.get("atr"),
-                    converted_data.get("score"),
-                    hh,
-                    hl,
-                    lh,
-                    ll,
-                    converted_data.get("ema_trend", "NEUTRAL"),
-                    converted_data.get("ema_score", 0),
-                ),
-            )
+                self._commit(conn)
+                log.debug("Saved %d signals", len(signals))
+                return len(signals)
+            except Exception as e:
+                print(f"Error saving signals: {e}")
+                self._rollback(conn)
+                raise
 
-            conn.commit()
-            signal_id = cursor.fetchone()[0]
-            print(f"Signal saved with ID: {signal_id}")
-            return signal_id
-
-        except Exception as e:
-            print(f"Error saving signal: {e}")
-            conn.rollback()
-            raise
-        finally:
-            cursor.close()
+    def bulk_copy_signals(self, signals):
+        """Backfill many signals with COPY FROM STDIN (CSV); for historical imports, not live ticks"""
+        return self._copy_rows("signals", SIGNAL_COLUMNS, (self._signal_row(s) for s in signals))
 
     def get_all_signals(self, market_type):
         """Get all signals for a market"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
+        with self._checkout() as conn, conn.cursor() as cursor:
             cursor.execute(
                 "SELECT * FROM signals WHERE market_type = %s ORDER BY timestamp DESC",
                 (market_type,),
             )
             return cursor.fetchall()
-        finally:
-            cursor.close()
+
+    def iter_signals(self, market_type, chunk=500):
+        """Stream all signals for a market through a server-side cursor, `chunk` rows per fetch.
+
+        Use this for bulk exports and get_all_signals for small UI reads. The pooled
+        connection stays checked out until the generator is exhausted or closed.
+        """
+        with self._checkout() as conn:
+            # Named cursor -> server-side: memori client O(chunk), bukan O(hasil)
+            with conn.cursor(name="signals_stream") as cursor:
+                cursor.itersize = chunk
+                cursor.execute(
+                    "SELECT * FROM signals WHERE market_type = %s ORDER BY timestamp DESC",
+                    (market_type,),
+                )
+                yield from cursor
+            # Tutup transaksi baca supaya koneksi kembali ke pool dalam keadaan bersih
+            self._commit(conn)
 
     def delete_signal_by_symbol(self, symbol, market_type):
         """Delete signal by symbol"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "DELETE FROM signals WHERE symbol = %s AND market_type = %s",
-                (symbol, market_type),
-            )
-            conn.commit()
-            print(f"Deleted signal for {symbol}")
-            return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Error deleting signal: {e}")
-            conn.rollback()
-            return False
-        finally:
-            cursor.close()
+        return self.delete_signals_by_symbols([symbol], market_type) > 0
+
+    def delete_signals_by_symbols(self, symbols, market_type):
+        """Delete signals for several symbols in one statement"""
+        symbols = list(symbols)
+        if not symbols:
+            return 0
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                # psycopg2 mengadaptasi list Python menjadi array Postgres: satu parameter, satu plan
+                cursor.execute(
+                    "DELETE FROM signals WHERE symbol = ANY(%s) AND market_type = %s",
+                    (symbols, market_type),
+                )
+                self._commit(conn)
+                log.debug("Deleted %d signals for %d symbols", cursor.rowcount, len(symbols))
+                return cursor.rowcount
+            except Exception as e:
+                print(f"Error deleting signals: {e}")
+                self._rollback(conn)
+                return 0
+
+    def delete_signals_not_in(self, symbols, market_type):
+        """Delete every signal of a market except the given symbols, in one statement"""
+        symbols = list(symbols)
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                if symbols:
+                    cursor.execute(
+                        "DELETE FROM signals WHERE market_type = %s AND symbol <> ALL(%s)",
+                        (market_type, symbols),
+                    )
+                else:
+                    cursor.execute("DELETE FROM signals WHERE market_type = %s", (market_type,))
+                self._commit(conn)
+                log.debug("Deleted %d non-selected signals", cursor.rowcount)
+                return cursor.rowcount
+            except Exception as e:
+                print(f"Error deleting signals: {e}")
+                self._rollback(conn)
+                return 0
 
     # =========================================================
     # Positions
     # =========================================================
+    def _position_row(
+        self,
+        symbol,
+        market_type,
+        action,
+        entry_price,
+        tp1,
+        tp2,
+        tp3,
+        sl,
+        entry_low=None,
+        entry_high=None,
+        current_price=None,
+    ):
+        """Build the INSERT parameter tuple for one position (default entry range / price)"""
+        if current_price is None:
+            current_price = entry_price
+        if entry_low is None:
+            entry_low = entry_price * 0.98
+        if entry_high is None:
+            entry_high = entry_price * 1.02
+        return (
+            symbol, market_type, action, entry_price,
+            entry_low, entry_high, tp1, tp2, tp3, sl, current_price,
+        )
+
     def save_position(
         self,
         symbol,
@@ -250,81 +586,88 @@ class DatabaseHandler:
         current_price=None,
     ):
         """Save a new position to the database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            if current_price is None:
-                current_price = entry_price
-            if entry_low is None:
-                entry_low = entry_price * 0.98
-            if entry_high is None:
-                entry_high = entry_price * 1.02
-
-            cursor.execute(
-                """
-                INSERT INTO positions (
-                    symbol, market_type, action, entry_price,
-                    entry_low, entry_high, tp1, tp2, tp3, sl, current_price
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (
-                    symbol,
-                    market_type,
-                    action,
-                    entry_price,
-                    entry_low,
-                    entry_high,
-                    tp1,
-                    tp2,
-                    tp3,
-                    sl,
-                    current_price,
-                ),
-            )
-
-            conn.commit()
-            position_id = cursor.fetchone()[0]
-            print(f"Position saved with ID: {position_id}")
-            return position_id
-
-        except Exception as e:
-            print(f"Error saving position: {e}")
-            conn.rollback()
+        ids = self.save_positions([dict(
+            symbol=symbol, market_type=market_type, action=action, entry_price=entry_price,
+            tp1=tp1, tp2=tp2, tp3=tp3, sl=sl,
+            entry_low=entry_low, entry_high=entry_high, current_price=current_price,
+        )])
+        if not ids:
             return None
-        finally:
-            cursor.close()
+        log.debug("Position saved with ID: %s", ids[0])
+        return ids[0]
+
+    def save_positions(self, positions):
+        """Insert many positions (dicts of save_position arguments) in one multi-row INSERT.
+
+        Return the new ids in order, or [] when the insert failed.
+        """
+        rows = [self._position_row(**p) for p in positions]
+        if not rows:
+            return []
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                if len(rows) == 1:
+                    self._execute(conn, cursor, "insert_position_v1", rows[0])
+                    ids = cursor.fetchall()
+                else:
+                    ids = execute_values(
+                        cursor, POSITION_INSERT_SQL, rows, page_size=POSITION_PAGE_SIZE, fetch=True
+                    )
+                self._commit(conn)
+                return [row[0] for row in ids]
+            except Exception as e:
+                print(f"Error saving position: {e}")
+                self._rollback(conn)
+                return []
 
     def update_position_current_price(self, symbol, current_price):
         """Update current price for a position"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "UPDATE positions SET current_price = %s WHERE symbol = %s AND status = 'active'",
-                (current_price, symbol),
-            )
-            conn.commit()
-            print(f"Updated current price for {symbol} to {current_price}")
-            return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Error updating current price: {e}")
-            conn.rollback()
-            return False
-        finally:
-            cursor.close()
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                self._execute(conn, cursor, "update_position_price_v1", (current_price, symbol))
+                self._commit(conn)
+                log.debug("Updated current price for %s to %s", symbol, current_price)
+                return cursor.rowcount > 0
+            except Exception as e:
+                print(f"Error updating current price: {e}")
+                self._rollback(conn)
+                return False
+
+    def update_position_prices(self, prices):
+        """Update current price for many symbols in one statement: {symbol: price}.
+
+        Return the number of updated position rows.
+        """
+        if not prices:
+            return 0
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                # Satu UPDATE ... FROM (VALUES ...) untuk semua simbol, bukan satu UPDATE per simbol
+                execute_values(
+                    cursor,
+                    """
+                    UPDATE positions SET current_price = data.price::REAL
+                    FROM (VALUES %s) AS data (symbol, price)
+                    WHERE positions.symbol = data.symbol AND positions.status = 'active'
+                    """,
+                    list(prices.items()),
+                    template="(%s, %s)",
+                    page_size=len(prices),
+                )
+                self._commit(conn)
+                return cursor.rowcount
+            except Exception as e:
+                print(f"Error updating current prices: {e}")
+                self._rollback(conn)
+                return 0
 
     def get_active_positions(self, market_type=None):
-        """Get active positions from database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
+        """Get active positions from database as PositionRow tuples"""
+        with self._checkout() as conn, conn.cursor() as cursor:
             if market_type:
                 cursor.execute(
-                    """
-                    SELECT * FROM positions
+                    f"""
+                    SELECT {POSITION_SELECT} FROM positions
                     WHERE status = %s AND market_type = %s
                     ORDER BY created_at DESC
                     """,
@@ -332,81 +675,41 @@ class DatabaseHandler:
                 )
             else:
                 cursor.execute(
-                    "SELECT * FROM positions WHERE status = %s ORDER BY created_at DESC",
+                    f"SELECT {POSITION_SELECT} FROM positions WHERE status = %s ORDER BY created_at DESC",
                     ("active",),
                 )
-            return cursor.fetchall()
-        finally:
-            cursor.close()
+            return list(map(PositionRow._make, cursor))
 
     def close_position(self, position_id, close_price, exit_type):
         """Close a position and save to history"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT * FROM positions WHERE id = %s", (position_id,))
-            position = cursor.fetchone()
-
-            if position:
-                if position[3] == "LONG":
-                    profit_loss = close_price - position[4]
-                else:  # SHORT
-                    profit_loss = position[4] - close_price
-
-                # Insert trade history
-                cursor.execute(
-                    """
-                    INSERT INTO trade_history (
-                        symbol, market_type, action,
-                        entry_price, exit_price, profit_loss, type
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        position[1],
-                        position[2],
-                        position[3],
-                        position[4],
-                        close_price,
-                        profit_loss,
-                        exit_type,
-                    ),
-                )
-
-                # Update position status
-                cursor.execute(
-                    """
-                    UPDATE positions
-                    SET status = 'closed', closed_at = CURRENT_TIMESTAMP, current_price = %s
-                    WHERE id = %s
-                    """,
-                    (close_price, position_id),
-                )
-
-                conn.commit()
-                print(f"Position {position_id} closed with P/L: {profit_loss}")
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                # P/L dihitung di server: LONG = exit - entry, SHORT = entry - exit
+                self._execute(conn, cursor, "close_position_v2", (
+                    close_price, position_id, close_price, close_price, close_price, exit_type,
+                ))
+                row = cursor.fetchone()
+                self._commit(conn)
+                if row is None:
+                    return False
+                log.debug("Position %s closed with P/L: %s", position_id, row[0])
                 return True
-            return False
 
-        except Exception as e:
-            print(f"Error closing position: {e}")
-            conn.rollback()
-            return False
-        finally:
-            cursor.close()
+            except Exception as e:
+                print(f"Error closing position: {e}")
+                self._rollback(conn)
+                return False
 
     # =========================================================
     # Trade History
     # =========================================================
     def get_trade_history(self, market_type=None, limit=10):
         """Get trade history from database"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
+        with self._checkout() as conn, conn.cursor() as cursor:
             if market_type:
                 cursor.execute(
-                    """
-                    SELECT * FROM trade_history
+                    f"""
+                    SELECT {HISTORY_SELECT} FROM trade_history
                     WHERE market_type = %s
                     ORDER BY timestamp DESC LIMIT %s
                     """,
@@ -414,25 +717,49 @@ class DatabaseHandler:
                 )
             else:
                 cursor.execute(
-                    "SELECT * FROM trade_history ORDER BY timestamp DESC LIMIT %s",
+                    f"SELECT {HISTORY_SELECT} FROM trade_history ORDER BY timestamp DESC LIMIT %s",
                     (limit,),
                 )
             return cursor.fetchall()
-        finally:
-            cursor.close()
+
+    def bulk_copy_trade_history(self, rows):
+        """Backfill trade history with COPY FROM STDIN (CSV).
+
+        Each row is a tuple in HISTORY_COLUMNS order without the id.
+        """
+        return self._copy_rows("trade_history", HISTORY_COLUMNS[1:], rows)
 
     # =========================================================
     # Utils
     # =========================================================
+    def _copy_rows(self, table, columns, rows):
+        """COPY rows into table through an in-memory CSV buffer; return the row count.
+
+        COPY skips per-row parse/plan; the tables have no triggers, so nothing is bypassed.
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        count = 0
+        for row in rows:
+            writer.writerow([_copy_cell(v) for v in row])
+            count += 1
+        if not count:
+            return 0
+        buf.seek(0)
+        with self._checkout() as conn, conn.cursor() as cursor:
+            try:
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV)", buf
+                )
+                self._commit(conn)
+                log.debug("Copied %d rows into %s", count, table)
+                return count
+            except Exception as e:
+                print(f"Error copying rows into {table}: {e}")
+                self._rollback(conn)
+                return 0
+
     def _convert_numpy_types(self, data):
-        """Convert numpy types to native Python types"""
-        if isinstance(data, dict):
-            return {k: self._convert_numpy_types(v) for k, v in data.items()}
-        if data is None:
-            return None
-        if hasattr(data, "item"):
-            return data.item()
-        try:
-            return float(data)
-        except Exception:
-            return str(data)
+        """Convert numpy scalars in a flat payload dict to native Python types"""
+        # Satu pass tanpa rekursi/try-except: str/int/float/None sudah diadaptasi psycopg2
+        return {k: _to_py(v) for k, v in data.items()}